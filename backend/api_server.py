@@ -7,6 +7,7 @@ Provides REST API endpoints for frontend integration
 import sys
 import os
 import json
+import asyncio
 import tempfile
 import shutil
 from typing import Optional, Dict, Any, List
@@ -79,6 +80,17 @@ class APIResponse(BaseModel):
 openai_key = None
 serpapi_key = None
 
+def save_upload_to_temp(file: UploadFile) -> str:
+    """Copy an uploaded file to a temporary file and return its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+        shutil.copyfileobj(file.file, temp_file)
+        return temp_file.name
+
+def read_file_bytes(path: str) -> bytes:
+    """Read a whole file"""
+    with open(path, "rb") as f:
+        return f.read()
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize API keys on startup"""
@@ -131,16 +143,15 @@ async def analyze_image(
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
     
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
+        # Save uploaded file temporarily (off the event loop)
+        temp_path = await asyncio.to_thread(save_upload_to_temp, file)
         
         # Initialize real products pathway for analysis
         real_products_pathway = RealProductsPathway(openai_key)
         
-        # Analyze the image
-        analysis_results = real_products_pathway.analyze_image(
+        # Analyze the image in a worker thread so other requests are still served
+        analysis_results = await asyncio.to_thread(
+            real_products_pathway.analyze_image,
             image_path=temp_path,
             design_style=design_style,
             custom_instructions=custom_instructions,
@@ -188,16 +199,15 @@ async def generate_real_products_pathway(
         )
     
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
+        # Save uploaded file temporarily (off the event loop)
+        temp_path = await asyncio.to_thread(save_upload_to_temp, file)
         
         # Initialize real products pathway
         real_products_pathway = RealProductsPathway(openai_key, fast_mode=fast_mode)
         
-        # Generate design with real products
-        results = real_products_pathway.generate_design_with_real_products(
+        # Generate design with real products in a worker thread so other requests are still served
+        results = await asyncio.to_thread(
+            real_products_pathway.generate_design_with_real_products,
             image_path=temp_path,
             design_style=design_style,
             custom_instructions=custom_instructions,
@@ -306,8 +316,7 @@ async def get_image(file_path: str):
             content_type = "image/webp"
         
         # Read and return the image
-        with open(image_path, "rb") as f:
-            image_data = f.read()
+        image_data = await asyncio.to_thread(read_file_bytes, image_path)
         
         return Response(content=image_data, media_type=content_type)
         
@@ -7,6 +7,7 @@ Captures timing for each processing step in the AI design pipeline
 import time
 import json
 import os
+import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
 from dataclasses import dataclass, asdict
@@ -40,7 +41,8 @@ class PerformanceTracker:
     
     def __init__(self, output_dir: str = "performance_tracking"):
         self.output_dir = output_dir
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Unique per run, so concurrent pipelines never share a report file
+        self.session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
         self.total_start_time = None
         self.total_end_time = None
         self.steps = []
@@ -99,6 +101,25 @@ class PerformanceTracker:
             status = "✅" if step.success else "❌"
             print(f"   {status} Completed step: {step_name} ({step.duration:.2f}s)")
     
+    def record_step(self, step_name: str, start_time: float, success: bool = True,
+                    error_message: Optional[str] = None,
+                    additional_data: Optional[Dict[str, Any]] = None) -> None:
+        """Record a step started at start_time and ending now, for work that no single block spans
+        (e.g. a stream read partly on another thread)"""
+        end_time = time.time()
+        self.steps.append(StepTiming(
+            step_name=step_name,
+            start_time=start_time,
+            end_time=end_time,
+            duration=end_time - start_time,
+            success=success,
+            error_message=error_message,
+            additional_data=additional_data
+        ))
+        
+        status = "✅" if success else "❌"
+        print(f"   {status} Completed step: {step_name} ({end_time - start_time:.2f}s)")
+    
     def get_step_summary(self) -> Dict[str, Any]:
         """Get a summary of all step timings"""
         summary = {
@@ -116,6 +137,11 @@ class PerformanceTracker:
         
         return summary
     
+    def get_report_path(self) -> str:
+        """Get the path the performance report is (or will be) saved to"""
+        filename = f"performance_report_{self.session_id}.json"
+        return os.path.join(self.output_dir, filename)
+    
     def save_performance_report(self) -> str:
         """Save performance report to JSON file"""
         if not self.total_start_time:
@@ -126,9 +152,7 @@ class PerformanceTracker:
         # Add timestamp
         report["timestamp"] = datetime.now().isoformat()
         
-        # Create filename
-        filename = f"performance_report_{self.session_id}.json"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = self.get_report_path()
         
         # Save to file
         with open(filepath, 'w') as f:
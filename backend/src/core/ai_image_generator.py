@@ -5,24 +5,70 @@ Provides a unified interface for both standard and real products pathways
 """
 
 import os
-import json
+import asyncio
+import hashlib
+import mmap
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 from datetime import datetime
 import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.config_settings import get_api_key, get_serpapi_key
-from src.core.real_products_pathway import RealProductsPathway
+from src.utils import json_utils
+from src.utils.file_utils import JsonFileCache, atomic_open
+
+if TYPE_CHECKING:
+    import requests
+
+
+# Upper bound on pipelines running at once through the async methods (OpenAI rate limits)
+MAX_CONCURRENT_PIPELINES = 4
+
+# On-disk cache of complete design results used by the CLI, so identical re-runs skip every API call
+DESIGN_CACHE_DIR = os.path.join(".cache", "designs")
+
+# OpenAI Vision rejects images above this size, so they are refused before any API call
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Formats accepted by save_results / --output-format
+OUTPUT_FORMATS = ("pretty", "compact", "ndjson")
+
+# Shared read-only defaults for print_results lookups, so missing keys don't allocate
+_EMPTY: dict = {}
+_NO_ITEMS: tuple = ()
 
 
 class AIImageGenerator:
     """Main AI Image Generator with support for both pathways"""
     
-    def __init__(self, api_key: str):
-        """Initialize the AI Image Generator with OpenAI API key"""
+    def __init__(self, api_key: str, http_session: Optional["requests.Session"] = None,
+                 cache_dir: Optional[str] = None, refresh_cache: bool = False,
+                 analysis_cache_dir: Optional[str] = None):
+        """Initialize the AI Image Generator with OpenAI API key
+        
+        Args:
+            cache_dir: Where finished design results are cached (e.g. DESIGN_CACHE_DIR, as the
+                CLI uses); None, the default, always generates a fresh design
+            refresh_cache: Ignore cached results but store the new ones
+            analysis_cache_dir: Where GPT-4o Vision analyses are cached (e.g. ANALYSIS_CACHE_DIR);
+                None, the default, always analyzes the image afresh
+        """
+        # Imported here so loading this module (e.g. for --help) skips PIL, requests and the pathway
+        from config.config_settings import get_serpapi_key
+        from src.core.clients import get_openai_session
+        from src.core.real_products_pathway import RealProductsPathway
+        
         self.api_key = api_key
-        self.real_products_pathway = RealProductsPathway(api_key)
+        # Resolved once rather than on every generate_design call
+        self.serpapi_key = get_serpapi_key()
+        self.cache_dir = cache_dir
+        self.design_cache = JsonFileCache(cache_dir, label="design cache") if cache_dir else None
+        self.refresh_cache = refresh_cache
+        self.http = http_session or get_openai_session()
+        self.real_products_pathway = RealProductsPathway(api_key, http_session=self.http,
+                                                         analysis_cache_dir=analysis_cache_dir)
+        # Created inside the running loop (see _get_pipeline_slots): on Python 3.9 a
+        # semaphore made here binds to a different loop than asyncio.run uses
+        self._pipeline_slots: Optional[asyncio.Semaphore] = None
+        self._pipeline_slots_loop = None
     
     def generate_design(self, 
                        image_path: str, 
@@ -30,14 +76,16 @@ class AIImageGenerator:
                        custom_instructions: str = "",
                        design_type: str = "interior redesign",
                        edit_mode: str = "edit",
-                       num_variations: int = 1) -> Dict[str, Any]:
+                       num_variations: int = 1,
+                       analysis_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate design using real products pathway"""
-        return self.real_products_pathway.generate_design_with_real_products(
+        return self._generate_cached(
             image_path=image_path,
             design_style=design_style,
             custom_instructions=custom_instructions,
             design_type=design_type,
-            serpapi_key=get_serpapi_key()
+            serpapi_key=self.serpapi_key,
+            analysis_results=analysis_results
         )
     
     def generate_design_with_real_products(self, 
@@ -45,21 +93,119 @@ class AIImageGenerator:
                                          design_style: str = "modern",
                                          custom_instructions: str = "",
                                          design_type: str = "interior redesign",
-                                         fast_mode: bool = False) -> Dict[str, Any]:
-        """Generate design using real products pathway (actual product images)"""
-        return self.real_products_pathway.generate_design_with_real_products(
+                                         fast_mode: bool = False,
+                                         analysis_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate design using real products pathway (actual product images)
+        
+        Args:
+            analysis_results: Precomputed analysis (e.g. from the Batch API) to skip the Vision call
+        """
+        return self._generate_cached(
             image_path=image_path,
             design_style=design_style,
             custom_instructions=custom_instructions,
             design_type=design_type,
-            fast_mode=fast_mode
+            fast_mode=fast_mode,
+            analysis_results=analysis_results
+        )
+    
+    def submit_analysis_batch(self, 
+                              image_paths: List[str], 
+                              design_style: str = "modern",
+                              custom_instructions: str = "",
+                              design_type: str = "interior redesign") -> str:
+        """Submit analyses of several images to the OpenAI Batch API (50% cost, results within 24h)"""
+        return self.real_products_pathway.submit_analysis_batch(
+            image_paths=image_paths,
+            design_style=design_style,
+            custom_instructions=custom_instructions,
+            design_type=design_type
         )
     
-    def save_results(self, results: Dict[str, Any], output_file: str = "design_results.json"):
-        """Save the design results to a JSON file"""
+    def wait_for_batch_analyses(self, batch_id: str, image_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Wait for an analysis batch to finish and return {image_path: analysis}"""
+        batch = self.real_products_pathway.wait_for_batch(batch_id)
+        return self.real_products_pathway.get_analysis_batch_results(batch, image_paths)
+    
+    def _generate_cached(self, image_path: str, **kwargs) -> Dict[str, Any]:
+        """Run the real products pathway, reusing a cached result for the same image and settings"""
+        cache_key = self._get_cache_key(image_path, kwargs)
+        if not self.refresh_cache:
+            cached_results = self._load_cached_results(cache_key)
+            if cached_results is not None:
+                print(f"💾 Using cached design results for: {os.path.basename(image_path)}")
+                return cached_results
+        
+        results = self.real_products_pathway.generate_design_with_real_products(image_path=image_path, **kwargs)
+        if cache_key and results and 'error' not in results:
+            self.design_cache.save(cache_key, results)
+        return results
+    
+    def _get_cache_key(self, image_path: str, settings: Dict[str, Any]) -> Optional[str]:
+        """Get the cache key for an image's content and the design settings (API keys excluded)"""
+        if not self.design_cache:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        with open(image_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+        # The SerpAPI key and precomputed analyses don't change what the settings ask for
+        digest.update(repr(sorted(
+            (k, v) for k, v in settings.items() if k not in ('serpapi_key', 'analysis_results')
+        )).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _load_cached_results(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Load cached results if present and their final design image still exists"""
+        if not cache_key:
+            return None
+        results = self.design_cache.load(cache_key)
+        if not results:
+            return None
+        final_design = results.get('final_design')
+        if final_design and not os.path.exists(final_design):
+            return None
+        return results
+    
+    def _get_pipeline_slots(self) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent pipelines, created once per running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._pipeline_slots_loop is not loop:
+            self._pipeline_slots = asyncio.Semaphore(MAX_CONCURRENT_PIPELINES)
+            self._pipeline_slots_loop = loop
+        return self._pipeline_slots
+    
+    async def agenerate_design(self, image_path: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_design; the blocking pipeline runs in a worker thread"""
+        async with self._get_pipeline_slots():
+            return await asyncio.to_thread(self.generate_design, image_path, **kwargs)
+    
+    async def agenerate_design_with_real_products(self, image_path: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_design_with_real_products, e.g. for asyncio.gather over many images"""
+        async with self._get_pipeline_slots():
+            return await asyncio.to_thread(self.generate_design_with_real_products, image_path, **kwargs)
+    
+    def save_results(self, results: Dict[str, Any], output_file: str = "design_results.json",
+                     output_format: str = "pretty"):
+        """Save the design results to a JSON file
+        
+        Args:
+            output_format: "pretty" (indented), "compact" (single line) or "ndjson"
+                (one {key: value} object per line for each top-level key)
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        # orjson when installed (UTF-8 output, no ensure_ascii escaping either way).
+        # Written atomically, so readers never see a partial file
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            with atomic_open(output_file, 'wb', buffering=1 << 20) as f:
+                if output_format == "ndjson":
+                    for key, value in results.items():
+                        f.write(json_utils.dumps({key: value}))
+                        f.write(b"\n")
+                else:
+                    f.write(json_utils.dumps(results, indent=output_format == "pretty"))
             print(f"✅ Results saved to {output_file}")
         except Exception as e:
             print(f"❌ Error saving results: {str(e)}")
@@ -70,72 +216,82 @@ class AIImageGenerator:
             print("❌ No results to display")
             return
         
-        print("\n" + "="*60)
-        print("🎨 DESIGN ANALYSIS RESULTS")
-        print("="*60)
+        # Build the whole report first and emit it with a single write
+        lines = ["\n" + "="*60]
+        lines.append("🎨 DESIGN ANALYSIS RESULTS")
+        lines.append("="*60)
         
         # Design Concept
-        design_concept = results.get('designConcept', {})
+        design_concept = results.get('designConcept', _EMPTY)
         if design_concept:
-            print(f"🎨 Style: {design_concept.get('style', 'Unknown')}")
-            print(f"🎨 Color Palette: {', '.join(design_concept.get('colorPalette', []))}")
-            print(f"🎨 Materials: {', '.join(design_concept.get('materials', []))}")
+            style = design_concept.get('style', 'Unknown')
+            colors = design_concept.get('colorPalette', _NO_ITEMS)
+            materials = design_concept.get('materials', _NO_ITEMS)
+            lines.append(f"🎨 Style: {style}\n"
+                         f"🎨 Color Palette: {', '.join(colors)}\n"
+                         f"🎨 Materials: {', '.join(materials)}")
         
         # Recommendations
-        recommendations = results.get('recommendations', [])
+        recommendations = results.get('recommendations', _NO_ITEMS)
         if recommendations:
-            print(f"\n📋 Recommendations ({len(recommendations)}):")
-            for i, rec in enumerate(recommendations[:5], 1):  # Show first 5
-                priority = rec.get('priority', 'Unknown')
-                area = rec.get('area', 'General')
-                description = rec.get('description', 'No description')[:100]
-                print(f"   {i}. [{priority}] {area}: {description}...")
+            lines.append(f"\n📋 Recommendations ({len(recommendations)}):")
+            lines.extend(
+                f"   {i}. [{rec.get('priority', 'Unknown')}] {rec.get('area', 'General')}: "
+                f"{rec.get('description', 'No description')[:100]}..."
+                for i, rec in enumerate(recommendations[:5], 1)  # Show first 5
+            )
         
         # Generated Image Info
         if 'generatedImage' in results:
             img_info = results['generatedImage']
-            print(f"\n🖼️  Generated Image:")
-            print(f"   📁 File: {img_info.get('filename', 'Unknown')}")
-            print(f"   🔗 URL: {img_info.get('url', 'Local file')}")
-            print(f"   🛤️  Pathway: {img_info.get('pathway', 'Unknown')}")
+            lines.append(f"\n🖼️  Generated Image:\n"
+                         f"   📁 File: {img_info.get('filename', 'Unknown')}\n"
+                         f"   🔗 URL: {img_info.get('url', 'Local file')}\n"
+                         f"   🛤️  Pathway: {img_info.get('pathway', 'Unknown')}")
         
         # Real Products Info
         if 'serpapiProductsComposition' in results:
             comp_info = results['serpapiProductsComposition']
-            print(f"\n🛒 Real Products Used:")
-            print(f"   📦 Products: {comp_info.get('products_used', 0)}")
-            print(f"   🛤️  Method: {comp_info.get('method', 'Unknown')}")
+            lines.append(f"\n🛒 Real Products Used:\n"
+                         f"   📦 Products: {comp_info.get('products_used', 0)}\n"
+                         f"   🛤️  Method: {comp_info.get('method', 'Unknown')}")
             
-            products_info = comp_info.get('products_info', [])
+            products_info = comp_info.get('products_info', _NO_ITEMS)
             if products_info:
-                print(f"   📋 Product Details:")
-                for i, product in enumerate(products_info[:3], 1):  # Show first 3
-                    name = product.get('name', 'Unknown')
-                    price = product.get('price', 'Unknown')
-                    retailer = product.get('retailer', 'Unknown')
-                    print(f"      {i}. {name} - ${price} ({retailer})")
-        
-        print("\n" + "="*60)
+                lines.append(f"   📋 Product Details:")
+                lines.extend(
+                    f"      {i}. {product.get('name', 'Unknown')} - ${product.get('price', 'Unknown')} "
+                    f"({product.get('retailer', 'Unknown')})"
+                    for i, product in enumerate(products_info[:3], 1)  # Show first 3
+                )
+        
+        lines.append("\n" + "="*60)
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def main():
     parser = argparse.ArgumentParser(description="AI Image Generator using OpenAI GPT-4 Vision + Image Edit API")
-    parser.add_argument("image_path", help="Path to the image file to analyze")
+    parser.add_argument("image_path", nargs="+", help="Path(s) to the image file(s) to analyze; several images share one generator")
     parser.add_argument("--api-key", help="OpenAI API key (or set OPENAI_API_KEY environment variable)")
     parser.add_argument("--style", default="modern", help="Design style (default: modern)")
     parser.add_argument("--instructions", default="", help="Custom design instructions")
     parser.add_argument("--type", default="interior redesign", help="Type of design (default: interior redesign)")
     parser.add_argument("--output", default="design_results.json", help="Output file for results")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="pretty", help="Results file format: pretty (indented JSON), compact (single-line JSON) or ndjson (one line per top-level key)")
     parser.add_argument("--no-save", action="store_true", help="Don't save results to file")
     parser.add_argument("--analysis-only", action="store_true", help="Only analyze, don't transform image")
     parser.add_argument("--mode", choices=["edit", "variations"], default="edit", help="Transformation mode: edit (modify based on analysis) or variations (create style variations)")
     parser.add_argument("--pathway", choices=["standard", "real_products"], default="real_products", help="Design pathway: real_products (use actual product images)")
     parser.add_argument("--variations", type=int, default=1, help="Number of variations to create (1-4, only used with --mode variations)")
     parser.add_argument("--fast", action="store_true", help="Enable fast mode for quicker processing (reduced quality)")
+    parser.add_argument("--batch", action="store_true", help="Analyze the images through the OpenAI Batch API (50%% cost, may take up to 24h)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write cached design results or image analyses")
+    parser.add_argument("--refresh-cache", action="store_true", help="Regenerate even if a cached result exists, then update the cache")
     
     args = parser.parse_args()
     
     # Get API key
+    from config.config_settings import get_api_key
     api_key = args.api_key or get_api_key()
     if not api_key:
         print("❌ Error: Please provide OpenAI API key via:")
@@ -144,16 +300,34 @@ def main():
         print("   3. Config file: Edit config.py and set API_KEY variable")
         return
     
-    # Check if image file exists
-    if not os.path.exists(args.image_path):
-        print(f"❌ Error: Image file '{args.image_path}' not found")
+    # Check the image files with one stat() each: they must exist and fit the Vision size limit
+    invalid = False
+    for path in args.image_path:
+        try:
+            image_size = os.stat(path).st_size
+        except FileNotFoundError:
+            print(f"❌ Error: Image file '{path}' not found")
+            invalid = True
+            continue
+        if image_size > MAX_IMAGE_BYTES:
+            print(f"❌ Error: Image file '{path}' is too large ({image_size / (1024 * 1024):.1f} MB, "
+                  f"limit {MAX_IMAGE_BYTES // (1024 * 1024)} MB)")
+            invalid = True
+    if invalid:
         return
     
     try:
+        from src.core.real_products_pathway import ANALYSIS_CACHE_DIR
+        
         # Initialize generator
-        generator = AIImageGenerator(api_key)
+        generator = AIImageGenerator(
+            api_key,
+            cache_dir=None if args.no_cache else DESIGN_CACHE_DIR,
+            refresh_cache=args.refresh_cache,
+            analysis_cache_dir=None if args.no_cache else ANALYSIS_CACHE_DIR
+        )
         
-        print(f"🔍 Analyzing image: {args.image_path}")
+        print(f"🔍 Analyzing image{'s' if len(args.image_path) > 1 else ''}: {', '.join(args.image_path)}")
         print(f"🎨 Design style: {args.style}")
         print(f"📝 Design type: {args.type}")
         print(f"🤖 Using: OpenAI GPT-4o Vision + Image Edit API")
@@ -172,11 +346,40 @@ def main():
             print(f"🛤️  Pathway: {args.pathway}")
             edit_mode = args.mode
         
+        # Non-interactive runs: analyze every image in one Batch API job first
+        batch_analyses = {}
+        if args.batch:
+            print(f"📦 Submitting {len(args.image_path)} analysis request(s) to the OpenAI Batch API...")
+            batch_id = generator.submit_analysis_batch(
+                image_paths=args.image_path,
+                design_style=args.style,
+                custom_instructions=args.instructions,
+                design_type=args.type
+            )
+            batch_analyses = generator.wait_for_batch_analyses(batch_id, args.image_path)
+            
+            if args.analysis_only:
+                output_root, output_ext = os.path.splitext(args.output)
+                for image_path in args.image_path:
+                    analysis = batch_analyses.get(image_path)
+                    if not analysis:
+                        print(f"❌ No batch analysis returned for {image_path}")
+                        continue
+                    generator.print_results(analysis)
+                    if not args.no_save:
+                        if len(args.image_path) == 1:
+                            output_file = args.output
+                        else:
+                            image_name = os.path.splitext(os.path.basename(image_path))[0]
+                            output_file = f"{output_root}_{image_name}{output_ext}"
+                        generator.save_results(analysis, output_file, args.output_format)
+                return
+        
         # Generate design using the appropriate pathway
         if args.pathway == "real_products" and not args.analysis_only:
             print("🛒 Using real products pathway...")
-            results = generator.generate_design_with_real_products(
-                image_path=args.image_path,
+            agenerate = generator.agenerate_design_with_real_products
+            options = dict(
                 design_style=args.style,
                 custom_instructions=args.instructions,
                 design_type=args.type,
@@ -184,8 +387,8 @@ def main():
             )
         else:
             print("🎨 Using standard pathway...")
-            results = generator.generate_design(
-                image_path=args.image_path,
+            agenerate = generator.agenerate_design
+            options = dict(
                 design_style=args.style,
                 custom_instructions=args.instructions,
                 design_type=args.type,
@@ -193,12 +396,35 @@ def main():
                 num_variations=args.variations if args.mode == "variations" else 1
             )
         
-        # Display results
-        generator.print_results(results)
+        # All images run through the one generator (and its pooled connections),
+        # at most MAX_CONCURRENT_PIPELINES at a time
+        async def generate_all():
+            return await asyncio.gather(
+                *(agenerate(image_path, **options, **({'analysis_results': batch_analyses[image_path]}
+                                                      if batch_analyses.get(image_path) else {}))
+                  for image_path in args.image_path),
+                return_exceptions=True
+            )
+        
+        all_results = asyncio.run(generate_all())
         
-        # Save results
-        if not args.no_save:
-            generator.save_results(results, args.output)
+        output_root, output_ext = os.path.splitext(args.output)
+        for image_path, results in zip(args.image_path, all_results):
+            if isinstance(results, Exception):
+                print(f"❌ Error processing {image_path}: {str(results)}")
+                continue
+            
+            # Display results
+            generator.print_results(results)
+            
+            # Save results (one file per image when several are given)
+            if not args.no_save:
+                if len(args.image_path) == 1:
+                    output_file = args.output
+                else:
+                    image_name = os.path.splitext(os.path.basename(image_path))[0]
+                    output_file = f"{output_root}_{image_name}{output_ext}"
+                generator.save_results(results, output_file, args.output_format)
             
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -4,13 +4,26 @@ Real Products Pathway
 Uses real product images from SerpAPI Google Shopping for AI design composition
 """
 
+import io
 import os
+import re
 import sys
-import base64
+import shutil
+import tempfile
+import hashlib
+import mmap
 import json
 import time
+import threading
+from contextlib import ExitStack
+from itertools import chain, islice
+try:
+    import pybase64 as base64  # SIMD-accelerated, same API as the stdlib module
+except ImportError:
+    import base64
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, Tuple
 from PIL import Image
 import openai
 import requests
@@ -18,187 +31,673 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.append('.')
 
 from src.shopping.serpapi_shopping_integration import SerpAPIShopping
-from .prompts import create_analysis_prompt, create_real_products_pathway_prompt
-from performance_tracking.performance_tracker import create_tracker, track_vision_analysis, track_product_search, track_image_generation, track_composite_creation
+from .clients import get_openai_session, CONNECT_TIMEOUT
+from src.utils import json_utils
+from src.utils.file_utils import JsonFileCache, atomic_open
+from .prompts import create_analysis_prompt, create_real_products_pathway_prompt, ANALYSIS_RESPONSE_SCHEMA
+from performance_tracking.performance_tracker import create_tracker, track_product_search, track_image_generation, track_composite_creation
+
+# Product fields returned to callers in products_info
+PRODUCT_INFO_KEYS = ('name', 'price', 'retailer', 'url', 'rating', 'reviews', 'image_path')
+
+# Batch API statuses after which a batch will not change any more
+BATCH_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# On-disk cache for GPT-4o Vision analyses, keyed by the full request payload. Opt-in (the CLI
+# and examples pass it): analyses are sampled at temperature 0.7, so a cache hit repeats one sample
+ANALYSIS_CACHE_DIR = os.path.join(".cache", "analysis")
+
+# gpt-image-1 edits take at most 16 input images: the room plus up to 15 products
+MAX_EDIT_IMAGES = 16
+
+# Image formats and pixel modes gpt-image-1 accepts as edit inputs; anything else
+# (BMP, TIFF, GIF, palette or CMYK images, ...) is re-encoded as PNG first
+EDIT_INPUT_FORMATS = ('PNG', 'JPEG', 'WEBP')
+EDIT_INPUT_MODES = ('RGB', 'RGBA', 'L', 'LA')
+
+# Image MIME types by file extension for the Vision data URL (anything else is sent as JPEG)
+_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+# JSON in a non-structured analysis response: a ```json fenced block, else the first balanced {...}
+_FENCED_JSON_RE = re.compile(r"```json(.*?)```", re.DOTALL)
+
+# Downloads are streamed to disk in chunks of this size instead of buffered whole
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Worker count for product image downloads (kept within the SerpAPI session's pool_maxsize)
+IMAGE_DOWNLOAD_WORKERS = 16
+
+# Longest side kept for downloaded product images; GPT Image 1 and the composite
+# only ever use them at small sizes, so bigger shopping photos are wasted upload bytes
+PRODUCT_IMAGE_MAX_SIDE = 512
+
+# Resampling filters: BICUBIC is about twice as fast as LANCZOS and looks the same
+# on intermediate images the model re-samples anyway; LANCZOS is kept for the
+# room image GPT Image 1 edits
+RESAMPLE_INTERMEDIATE = Image.Resampling.BICUBIC
+RESAMPLE_FINAL = Image.Resampling.LANCZOS
+
+
+# Longest image side sent to GPT-4o Vision; high detail never looks at more than 2048px,
+# so larger photos are only wasted upload bytes. Fast mode goes down to 1024px
+VISION_MAX_SIDE = 2048
+FAST_VISION_MAX_SIDE = 1024
+
+
+def _downscale_for_vision(img: "Image.Image", max_side: int) -> memoryview:
+    """Shrink an image to fit max_side and re-encode it as JPEG (quality 85)"""
+    # For JPEGs, let libjpeg decode straight at 1/2, 1/4 or 1/8 scale (DCT scaling)
+    # instead of decoding every pixel and then shrinking
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_side, max_side))
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    
+    # Convert to RGB if necessary (JPEG doesn't support transparency)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create white background for transparent images
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format='JPEG', quality=85, optimize=True)
+    # A view of the buffer, so base64 encodes the JPEG without copying it to bytes first
+    return img_buffer.getbuffer()
+
+
+def _shrink_product_image(image_path: str, max_side: int, resample: int = RESAMPLE_INTERMEDIATE) -> str:
+    """Downscale a downloaded product image to fit max_side, replacing the file; returns the path to use"""
+    try:
+        with Image.open(image_path) as img:
+            if max(img.size) <= max_side:
+                return image_path
+            if img.format == 'JPEG':
+                img.draft('RGB', (max_side, max_side))
+            img.thumbnail((max_side, max_side), resample)
+        
+        # Cut-out product shots keep their transparency as PNG; everything else is JPEG.
+        # Written atomically, so the original file is never rewritten in place
+        root = os.path.splitext(image_path)[0]
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            shrunk_path = root + '.png'
+            with atomic_open(shrunk_path) as f:
+                img.save(f, format='PNG')
+        else:
+            shrunk_path = root + '.jpg'
+            with atomic_open(shrunk_path) as f:
+                (img if img.mode == 'RGB' else img.convert('RGB')).save(f, format='JPEG', quality=90)
+    except OSError as e:
+        print(f"   ⚠️ Could not shrink {os.path.basename(image_path)}: {e}")
+        return image_path
+    
+    if shrunk_path != image_path:
+        os.remove(image_path)
+    return shrunk_path
+
+
+def _detected_mime_type(image_path: str) -> Optional[str]:
+    """MIME type of the image format PIL detects in the file (header only), or None if it cannot tell"""
+    try:
+        with Image.open(image_path) as img:
+            return Image.MIME.get(img.format)
+    except OSError:
+        return None
+
+
+def _load_product_thumbnail(image_path: str, product_size: int) -> "Image.Image":
+    """Load a product image and resize it to fit a product_size square, keeping its aspect ratio"""
+    with Image.open(image_path) as product_img:
+        # Reduced-scale JPEG decode; the original size is still used for the aspect ratio
+        original_product_width, original_product_height = product_img.size
+        if product_img.format == 'JPEG':
+            product_img.draft('RGB', (product_size, product_size))
+        product_aspect_ratio = original_product_width / original_product_height
+        
+        # Resize product image while maintaining aspect ratio
+        if product_aspect_ratio > 1:  # Landscape
+            new_product_width = product_size
+            new_product_height = int(product_size / product_aspect_ratio)
+        else:  # Portrait or square
+            new_product_height = product_size
+            new_product_width = int(product_size * product_aspect_ratio)
+        
+        # BILINEAR is plenty for 150-200px cells that GPT Image 1 re-samples anyway;
+        # LANCZOS is kept for the base image where detail matters
+        thumbnail = product_img.resize((new_product_width, new_product_height), Image.Resampling.BILINEAR)
+    
+    # Match the RGB canvas here on the worker thread, so the paste is a plain copy
+    return thumbnail if thumbnail.mode == 'RGB' else thumbnail.convert('RGB')
+
+
+def _extract_json_object(content: str) -> Optional[str]:
+    """Return the first complete top-level {...} in content, found in one pass that skips strings"""
+    depth = 0
+    start = None
+    in_string = False
+    escape = False
+    for i, char in enumerate(content):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            # Quotes in prose around the object are not JSON strings
+            in_string = depth > 0
+        elif char == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    return None
+
+
+@lru_cache(maxsize=4)
+def _encode_image(image_path: str, mtime: float, size: int, fast_mode: bool) -> Tuple[str, Optional[str]]:
+    """Base64-encode an image file for Vision; mtime and size are part of the cache key so edited files are re-read
+    
+    Returns:
+        (base64 data, "image/jpeg" if the image was downscaled and re-encoded, else None)
+    """
+    max_side = FAST_VISION_MAX_SIDE if fast_mode else VISION_MAX_SIDE
+    # Opening only parses the header; pixels are decoded if the image has to be shrunk
+    with Image.open(image_path) as img:
+        if fast_mode or max(img.size) > max_side:
+            return base64.b64encode(_downscale_for_vision(img, max_side)).decode('ascii'), 'image/jpeg'
+    
+    # Small enough to send as is: the file is mapped and encoded directly
+    # rather than copied into an intermediate bytes object first
+    with open(image_path, 'rb') as image_file:
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            return base64.b64encode(mapped).decode('ascii'), None
+
+
+class _StreamingArrayScanner:
+    """Incrementally pull complete objects out of a JSON array while its text is still streaming in"""
+    
+    def __init__(self, key: str):
+        self.marker = f'"{key}"'
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0  # 0 = array not reached yet, 1 = inside the array
+        self.done = False
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        self.prefix = None  # Fields that precede the array, once the array has been reached
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add streamed text and return any array items completed by it"""
+        self.buffer += text
+        items = []
+        if self.done:
+            return items
+        if self.depth == 0:
+            marker_idx = self.buffer.find(self.marker)
+            if marker_idx == -1:
+                return items
+            array_idx = self.buffer.find('[', marker_idx + len(self.marker))
+            if array_idx == -1:
+                return items
+            self.depth = 1
+            self.pos = array_idx + 1
+            self.prefix = self._parse_prefix(self.buffer[:marker_idx])
+        
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 1 and char == '{':
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 1 and self.item_start is not None:
+                    try:
+                        items.append(json_utils.loads(self.buffer[self.item_start:self.pos + 1]))
+                    except json.JSONDecodeError:
+                        pass  # The full response is still parsed at the end
+                    self.item_start = None
+                elif self.depth == 0:
+                    self.done = True
+                    self.pos += 1
+                    break
+            self.pos += 1
+        return items
+    
+    @staticmethod
+    def _parse_prefix(text: str) -> Dict[str, Any]:
+        """Parse the complete top-level fields streamed before the array key"""
+        try:
+            prefix = json_utils.loads(text.rstrip().rstrip(',') + '}')
+            return prefix if isinstance(prefix, dict) else {}
+        except ValueError:
+            return {}
 
 
 class RealProductsPathway:
     """Handles the real products pathway: actual product images"""
     
-    def __init__(self, api_key: str, fast_mode: bool = False):
+    def __init__(self, api_key: str, fast_mode: bool = False, http_session: Optional[requests.Session] = None,
+                 analysis_cache_dir: Optional[str] = None, vision_detail: Optional[str] = None):
         self.api_key = api_key
+        # Vision "detail" level: low is a flat ~85 tokens per image, so fast mode uses it
+        self.vision_detail = vision_detail or ("low" if fast_mode else "auto")
+        # Analyses are only cached when a directory (e.g. ANALYSIS_CACHE_DIR) is passed
+        self.analysis_cache_dir = analysis_cache_dir
+        self.analysis_cache = JsonFileCache(analysis_cache_dir, label="analysis cache") if analysis_cache_dir else None
+        # Pooled session shared by every pathway/generator unless one is passed in
+        self.http = http_session or get_openai_session()
         # Use faster model in fast mode
         self.vision_model = "gpt-4o-mini" if fast_mode else "gpt-4o"
         self.fast_mode = fast_mode
         self.chat_url = "https://api.openai.com/v1/chat/completions"
         self.image_edit_url = "https://api.openai.com/v1/images/edits"
+        self.files_url = "https://api.openai.com/v1/files"
+        self.batches_url = "https://api.openai.com/v1/batches"
+        # The key is fixed per instance, so request headers are built once
+        self._auth_headers = {"Authorization": f"Bearer {api_key}"}
+        self._json_headers = {"Content-Type": "application/json", **self._auth_headers}
+        # One SerpAPI client per key, so its pooled session is kept across pipeline runs
+        self._serpapi_clients: Dict[str, SerpAPIShopping] = {}
+        self._serpapi_clients_lock = threading.Lock()
+    
+    def get_serpapi_shopping(self, serpapi_key: Optional[str]) -> SerpAPIShopping:
+        """Get the shared SerpAPIShopping client for a key, creating it on first use"""
+        with self._serpapi_clients_lock:
+            client = self._serpapi_clients.get(serpapi_key)
+            if client is None:
+                client = self._serpapi_clients[serpapi_key] = SerpAPIShopping(serpapi_key)
+            return client
     
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 for API submission"""
+        return self.encode_image_for_vision(image_path)[0]
+    
+    def encode_image_for_vision(self, image_path: str) -> Tuple[str, Optional[str]]:
+        """Encode image to base64, downscaled for Vision; also returns "image/jpeg" if it was re-encoded"""
         try:
-            # Optimize image size in fast mode
-            if self.fast_mode:
-                from PIL import Image
-                with Image.open(image_path) as img:
-                    # Resize to max 1024x1024 for faster processing
-                    img.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
-                    
-                    # Convert to RGB if necessary (JPEG doesn't support transparency)
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        # Create white background for transparent images
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                        img = background
-                    elif img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    
-                    # Save to memory as JPEG for smaller size
-                    import io
-                    img_buffer = io.BytesIO()
-                    img.save(img_buffer, format='JPEG', quality=85, optimize=True)
-                    img_buffer.seek(0)
-                    image_data = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-                    return image_data
-            else:
-                # Original encoding for full quality
-                with open(image_path, 'rb') as image_file:
-                    image_data = base64.b64encode(image_file.read()).decode('utf-8')
-                return image_data
+            # Repeated calls for the same unchanged file reuse the cached encoding
+            image_stat = os.stat(image_path)
+            return _encode_image(image_path, image_stat.st_mtime, image_stat.st_size, self.fast_mode)
         except Exception as e:
             raise Exception(f"Error encoding image: {str(e)}")
     
     def prepare_image_for_edit(self, image_path: str) -> str:
-        """Prepare and resize image for OpenAI Edit API (must be PNG, square, <4MB)"""
+        """Prepare and resize image for OpenAI Edit API (must be PNG, square, <4MB)
+        
+        Returns the original path, without writing a copy, if the image already qualifies;
+        otherwise a file in the system temp directory that the caller should delete after the edit
+        """
         try:
             from PIL import Image
             
-            # Open image
-            img = Image.open(image_path)
-            
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to 1024x1024 (OpenAI requirement)
-            img = img.resize((1024, 1024), Image.Resampling.LANCZOS)
+            # Open image; the source file is closed once the resized copy exists
+            with Image.open(image_path) as img:
+                # Already a 1024x1024 RGB PNG under 4MB: nothing to convert
+                if (img.format == 'PNG' and img.mode == 'RGB' and img.size == (1024, 1024)
+                        and os.path.getsize(image_path) < 4 * 1024 * 1024):
+                    return image_path
+                
+                # Large JPEGs are decoded at reduced scale (still at least 1024px a side)
+                if img.format == 'JPEG':
+                    img.draft('RGB', (1024, 1024))
+                
+                # Convert to RGB if necessary
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                
+                # Resize to 1024x1024 (OpenAI requirement); LANCZOS matters when enlarging,
+                # while a pure downscale looks the same with the cheaper BILINEAR
+                resample = RESAMPLE_FINAL if min(img.size) < 1024 else Image.Resampling.BILINEAR
+                img = img.resize((1024, 1024), resample)
             
-            # Save as PNG
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            prepared_path = f"temp_prepared_{timestamp}.png"
-            img.save(prepared_path, 'PNG')
+            # Save as PNG to a uniquely named temp file instead of the working directory;
+            # default compression, since the file exists to be uploaded under the 4MB limit
+            with tempfile.NamedTemporaryFile(prefix="prepared_", suffix=".png", delete=False) as prepared_file:
+                img.save(prepared_file, 'PNG')
             
-            return prepared_path
+            return prepared_file.name
             
         except Exception as e:
             raise Exception(f"Error preparing image: {str(e)}")
     
+    def build_analysis_payload(self, 
+                               image_path: str, 
+                               design_style: str = "modern",
+                               custom_instructions: str = "",
+                               design_type: str = "interior redesign") -> Dict[str, Any]:
+        """Build the GPT-4o Vision chat completions request body for an image"""
+        # Encode the image
+        base64_image, encoded_mime_type = self.encode_image_for_vision(image_path)
+        
+        # Create the prompt
+        prompt = create_analysis_prompt(design_style, custom_instructions, design_type)
+        
+        # Determine image MIME type
+        mime_type = encoded_mime_type or _MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), 'image/jpeg')
+        
+        return {
+            "model": self.vision_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime_type};base64,{base64_image}",
+                                "detail": self.vision_detail
+                            }
+                        }
+                    ]
+                }
+            ],
+            # Structured outputs: the model is held to the schema, which no longer
+            # has to be spelled out (and billed) as prompt text
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "DesignPlan",
+                    "schema": ANALYSIS_RESPONSE_SCHEMA,
+                    "strict": True
+                }
+            },
+            # Optimize for speed in fast mode
+            "max_tokens": 2048 if self.fast_mode else 3072,
+            "temperature": 0 if self.fast_mode else 0.7
+        }
+    
+    def parse_analysis_response(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the design JSON from a chat completions response body"""
+        if 'choices' in result and len(result['choices']) > 0:
+            content = result['choices'][0]['message']['content']
+            
+            # Structured outputs return bare JSON: parse it directly without scanning
+            stripped = content.strip()
+            if stripped.startswith('{'):
+                try:
+                    return json_utils.loads(stripped)
+                except ValueError:
+                    pass  # Trailing prose or similar; fall back to extraction
+            
+            # Try to extract JSON from the response
+            try:
+                # Look for JSON block in the response, else the first complete {...}
+                match = _FENCED_JSON_RE.search(content)
+                json_content = match.group(1).strip() if match else _extract_json_object(content)
+                if json_content is None:
+                    raise Exception("No JSON found in response")
+                
+                design_data = json_utils.loads(json_content)
+                return design_data
+                
+            except json.JSONDecodeError as e:
+                print(f"⚠️  JSON parsing error: {e}")
+                print(f"Raw response: {content[:500]}...")
+                raise Exception(f"Failed to parse AI response as JSON: {e}")
+                
+        else:
+            raise Exception("No response from OpenAI Vision API")
+    
     def analyze_image(self, 
                      image_path: str, 
                      design_style: str = "modern",
                      custom_instructions: str = "",
-                     design_type: str = "interior redesign") -> Dict[str, Any]:
-        """Analyze image with GPT-4o Vision"""
+                     design_type: str = "interior redesign",
+                     use_cache: bool = True) -> Dict[str, Any]:
+        """Analyze image with GPT-4o Vision
+        
+        Args:
+            use_cache: Read and write the on-disk analysis cache; pass False for a fresh
+                analysis (e.g. to get a different sample at temperature > 0)
+        """
         
         try:
-            # Encode the image
-            base64_image = self.encode_image(image_path)
-            
-            # Create the prompt
-            prompt = create_analysis_prompt(design_style, custom_instructions, design_type)
-            
-            # Determine image MIME type
-            extension = os.path.splitext(image_path)[1].lower()
-            mime_types = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg', 
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            mime_type = mime_types.get(extension, 'image/jpeg')
+            payload = self.build_analysis_payload(image_path, design_style, custom_instructions, design_type)
             
-            # Prepare the API request
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+            # Serialized once: the same bytes are hashed for the cache key and sent as the body
+            body = json_utils.dumps(payload)
             
-            payload = {
-                "model": self.vision_model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{mime_type};base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                # Optimize for speed in fast mode
-                "max_tokens": 2048 if self.fast_mode else 3072,
-                "temperature": 0 if self.fast_mode else 0.7
-            }
+            # Same image + prompt + model settings -> reuse the stored analysis
+            cache_key = self._get_analysis_cache_key(body) if use_cache else None
+            cached_analysis = self.analysis_cache.load(cache_key) if cache_key else None
+            if cached_analysis is not None:
+                print(f"💾 Using cached analysis for: {os.path.basename(image_path)}")
+                return cached_analysis
             
+            # Prepare the API request
             # Make API call
-            response = requests.post(
+            response = self.http.post(
                 self.chat_url,
-                headers=headers,
-                json=payload,
-                timeout=60
+                headers=self._json_headers,
+                data=body,
+                timeout=(CONNECT_TIMEOUT, 60)
             )
             
             if not response.ok:
                 error_details = response.text
                 raise Exception(f"OpenAI Vision API Error: {response.status_code} - {error_details}")
             
-            result = response.json()
-            
-            # Extract and parse the response
-            if 'choices' in result and len(result['choices']) > 0:
-                content = result['choices'][0]['message']['content']
+            design_data = self.parse_analysis_response(json_utils.loads(response.content))
+            if cache_key:
+                self.analysis_cache.save(cache_key, design_data)
+            return design_data
                 
-                # Try to extract JSON from the response
-                try:
-                    # Look for JSON block in the response
-                    if "```json" in content:
-                        json_start = content.find("```json") + 7
-                        json_end = content.find("```", json_start)
-                        json_content = content[json_start:json_end].strip()
-                    elif content.strip().startswith('{'):
-                        json_content = content.strip()
-                    else:
-                        # If no clear JSON structure, try to find the first { and last }
-                        start_idx = content.find('{')
-                        end_idx = content.rfind('}')
-                        if start_idx != -1 and end_idx != -1:
-                            json_content = content[start_idx:end_idx+1]
-                        else:
-                            raise Exception("No JSON found in response")
-                    
-                    design_data = json.loads(json_content)
-                    return design_data
-                    
-                except json.JSONDecodeError as e:
-                    print(f"⚠️  JSON parsing error: {e}")
-                    print(f"Raw response: {content[:500]}...")
-                    raise Exception(f"Failed to parse AI response as JSON: {e}")
-                    
-            else:
-                raise Exception("No response from OpenAI Vision API")
+        except Exception as e:
+            raise Exception(f"Error in image analysis: {str(e)}")
+    
+    def _get_analysis_cache_key(self, body: bytes) -> Optional[str]:
+        """Get the cache key for a serialized analysis request (hash of image, prompt and model settings)"""
+        if not self.analysis_cache:
+            return None
+        return hashlib.sha256(body).hexdigest()
+    
+    def analyze_image_stream(self, 
+                             image_path: str, 
+                             design_style: str = "modern",
+                             custom_instructions: str = "",
+                             design_type: str = "interior redesign",
+                             analysis_out: Optional[Dict[str, Any]] = None,
+                             use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """Analyze image with GPT-4o Vision, yielding each recommendation as soon as it is streamed
+        
+        Args:
+            analysis_out: Filled with the fields that precede the recommendations (palette,
+                room analysis, ...) before the first one is yielded, and with the complete
+                analysis once the stream has finished
+            use_cache: Read and write the same on-disk analysis cache as analyze_image
+        """
+        
+        try:
+            payload = self.build_analysis_payload(image_path, design_style, custom_instructions, design_type)
+            
+            # Shares analyze_image's cache entries (the key is the non-streaming payload)
+            cache_key = self._get_analysis_cache_key(json_utils.dumps(payload)) if use_cache else None
+            cached_analysis = self.analysis_cache.load(cache_key) if cache_key else None
+            if cached_analysis is not None:
+                print(f"💾 Using cached analysis for: {os.path.basename(image_path)}")
+                if analysis_out is not None:
+                    analysis_out.update(cached_analysis)
+                yield from cached_analysis.get('recommendations', [])
+                return
+            
+            payload["stream"] = True
+            
+            scanner = _StreamingArrayScanner('recommendations')
+            prefix_sent = False
+            content_parts = []
+            with self.http.post(self.chat_url, headers=self._json_headers, data=json_utils.dumps(payload), timeout=(CONNECT_TIMEOUT, 60), stream=True) as response:
+                if not response.ok:
+                    error_details = response.text
+                    raise Exception(f"OpenAI Vision API Error: {response.status_code} - {error_details}")
+                
+                # Server-sent events: one "data: {...}" chunk per line, ending with "data: [DONE]"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data: '):
+                        continue
+                    data = line[len('data: '):]
+                    if data == '[DONE]':
+                        break
+                    choices = json_utils.loads(data).get('choices') or [{}]
+                    # Cut off at max_tokens: the JSON is incomplete, so fail before the caller
+                    # spends more on the recommendations already yielded
+                    if choices[0].get('finish_reason') == 'length':
+                        raise Exception("Vision response was truncated at max_tokens (finish_reason=length)")
+                    delta = choices[0].get('delta', {}).get('content')
+                    if delta:
+                        content_parts.append(delta)
+                        items = scanner.feed(delta)
+                        if not prefix_sent and scanner.prefix is not None:
+                            prefix_sent = True
+                            if analysis_out is not None:
+                                analysis_out.update(scanner.prefix)
+                        yield from items
+            
+            design_data = self.parse_analysis_response(
+                {'choices': [{'message': {'content': ''.join(content_parts)}}]}
+            )
+            if cache_key:
+                self.analysis_cache.save(cache_key, design_data)
+            if analysis_out is not None:
+                analysis_out.update(design_data)
                 
         except Exception as e:
             raise Exception(f"Error in image analysis: {str(e)}")
     
+    def submit_analysis_batch(self, 
+                              image_paths: List[str], 
+                              design_style: str = "modern",
+                              custom_instructions: str = "",
+                              design_type: str = "interior redesign") -> str:
+        """Submit image analyses to the OpenAI Batch API (50% cost, results within 24h)
+        
+        Returns:
+            The batch ID, to be passed to wait_for_batch()
+        """
+        try:
+            # One JSONL request line per image; custom_id maps results back to paths
+            lines = []
+            for i, image_path in enumerate(image_paths):
+                payload = self.build_analysis_payload(image_path, design_style, custom_instructions, design_type)
+                lines.append(json_utils.dumps({
+                    "custom_id": f"analysis-{i}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": payload
+                }))
+            batch_input = b"\n".join(lines) + b"\n"
+            
+            # Upload the request file
+            response = self.http.post(
+                self.files_url,
+                headers=self._auth_headers,
+                files={'file': ('analysis_batch.jsonl', batch_input, 'application/jsonl')},
+                data={'purpose': 'batch'},
+                timeout=(CONNECT_TIMEOUT, 120)
+            )
+            if not response.ok:
+                raise Exception(f"OpenAI Files API Error: {response.status_code} - {response.text}")
+            input_file_id = response.json()['id']
+            
+            # Create the batch
+            response = self.http.post(
+                self.batches_url,
+                headers=self._auth_headers,
+                json={
+                    "input_file_id": input_file_id,
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h"
+                },
+                timeout=(CONNECT_TIMEOUT, 60)
+            )
+            if not response.ok:
+                raise Exception(f"OpenAI Batch API Error: {response.status_code} - {response.text}")
+            
+            batch_id = response.json()['id']
+            print(f"📦 Submitted analysis batch {batch_id} ({len(image_paths)} images)")
+            return batch_id
+            
+        except Exception as e:
+            raise Exception(f"Error submitting analysis batch: {str(e)}")
+    
+    def wait_for_batch(self, batch_id: str, poll_interval: float = 10, max_poll_interval: float = 300) -> Dict[str, Any]:
+        """Poll a batch with exponential backoff until it reaches a terminal status"""
+        
+        while True:
+            response = self.http.get(f"{self.batches_url}/{batch_id}", headers=self._auth_headers, timeout=(CONNECT_TIMEOUT, 60))
+            if not response.ok:
+                raise Exception(f"OpenAI Batch API Error: {response.status_code} - {response.text}")
+            
+            batch = response.json()
+            status = batch.get('status')
+            if status in BATCH_TERMINAL_STATUSES:
+                print(f"📦 Batch {batch_id} finished with status: {status}")
+                return batch
+            
+            counts = batch.get('request_counts') or {}
+            print(f"   ⏳ Batch {batch_id} {status} ({counts.get('completed', 0)}/{counts.get('total', '?')} done), checking again in {poll_interval:.0f}s")
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, max_poll_interval)
+    
+    def get_analysis_batch_results(self, batch: Dict[str, Any], image_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Download a completed analysis batch and parse results, keyed by image path"""
+        if batch.get('status') != 'completed' or not batch.get('output_file_id'):
+            raise Exception(f"Batch {batch.get('id')} did not complete: {batch.get('status')}")
+        
+        response = self.http.get(f"{self.files_url}/{batch['output_file_id']}/content", headers=self._auth_headers, timeout=(CONNECT_TIMEOUT, 120))
+        if not response.ok:
+            raise Exception(f"OpenAI Files API Error: {response.status_code} - {response.text}")
+        
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            item = json_utils.loads(line)
+            index = int(item['custom_id'].rsplit('-', 1)[1])
+            image_path = image_paths[index]
+            
+            item_response = item.get('response') or {}
+            if item.get('error') or item_response.get('status_code') != 200:
+                print(f"⚠️  Batch analysis failed for {image_path}: {item.get('error') or item_response.get('body')}")
+                continue
+            
+            try:
+                results[image_path] = self.parse_analysis_response(item_response['body'])
+            except Exception as e:
+                print(f"⚠️  Could not parse batch analysis for {image_path}: {e}")
+        
+        return results
+    
     def create_composite_layout(self, base_image_path: str, products: List[Dict], output_dir: str) -> str:
         """Create a composite layout with base image on left and products on right, maintaining aspect ratios"""
         try:
@@ -209,6 +708,11 @@ class RealProductsPathway:
             base_width, base_height = base_img.size
             base_aspect_ratio = base_width / base_height
             
+            # The base image is never placed above 1024px, so large JPEGs can be decoded at
+            # reduced scale; the target size below still comes from the original dimensions
+            if base_img.format == 'JPEG':
+                base_img.draft('RGB', (1024, 1024))
+            
             print(f"   📐 Original base image: {base_width}x{base_height} (aspect ratio: {base_aspect_ratio:.2f})")
             
             # Apply fast mode optimizations for composite layout
@@ -279,6 +783,13 @@ class RealProductsPathway:
                     products_by_type[product_type] = []
                 products_by_type[product_type].append(product)
             
+            # Decode and resize the product images on a thread pool (PIL releases the GIL
+            # for both); pasting onto the shared canvas stays on this thread
+            ordered_products = [product for type_products in products_by_type.values() for product in type_products]
+            with ThreadPoolExecutor(max_workers=min(len(ordered_products), os.cpu_count() or 4) or 1) as load_pool:
+                thumbnail_futures = [load_pool.submit(_load_product_thumbnail, product.get('image_path'), product_size)
+                                     for product in ordered_products]
+            
             # Place products on the right, organized by type
             product_index = 0
             for product_type, type_products in products_by_type.items():
@@ -286,20 +797,8 @@ class RealProductsPathway:
                 
                 for product in type_products:
                     try:
-                        # Load product image
-                        product_img = Image.open(product['image_path'])
-                        original_product_width, original_product_height = product_img.size
-                        product_aspect_ratio = original_product_width / original_product_height
-                        
-                        # Resize product image while maintaining aspect ratio
-                        if product_aspect_ratio > 1:  # Landscape
-                            new_product_width = product_size
-                            new_product_height = int(product_size / product_aspect_ratio)
-                        else:  # Portrait or square
-                            new_product_height = product_size
-                            new_product_width = int(product_size * product_aspect_ratio)
-                        
-                        product_img = product_img.resize((new_product_width, new_product_height), Image.Resampling.LANCZOS)
+                        product_img = thumbnail_futures[product_index].result()
+                        new_product_width, new_product_height = product_img.size
                         
                         # Calculate position
                         row = product_index // products_per_row
@@ -344,8 +843,10 @@ class RealProductsPathway:
             
             # Save composite
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            composite_path = os.path.join(output_dir, f"composite_layout_{timestamp}.png")
-            composite.save(composite_path)
+            # JPEG: the composite is photographic and only read back for the edit upload,
+            # so lossless PNG just costs encode time and disk
+            composite_path = os.path.join(output_dir, f"composite_layout_{timestamp}.jpg")
+            composite.save(composite_path, 'JPEG', quality=90)
             
             print(f"✅ Composite layout created: {composite_path}")
             return composite_path
@@ -380,58 +881,53 @@ Rules:
             # Prepare the image for GPT Image 1 (Image Edit API)
             print("🖼️ Preparing image for GPT Image 1...")
             
-            # Load and prepare the image
-            img = Image.open(composite_image_path)
-            
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to 1024x1024 (GPT Image 1 requirement) while maintaining aspect ratio
-            original_width, original_height = img.size
-            original_aspect_ratio = original_width / original_height
-            
-            print(f"   📐 Original composite: {original_width}x{original_height} (aspect ratio: {original_aspect_ratio:.2f})")
-            
-            # Create a 1024x1024 canvas and center the image maintaining aspect ratio
-            canvas = Image.new('RGB', (1024, 1024), 'white')
-            
-            # Calculate new dimensions to fit within 1024x1024 while maintaining aspect ratio
-            if original_aspect_ratio > 1:  # Landscape
-                new_width = 1024
-                new_height = int(1024 / original_aspect_ratio)
-            else:  # Portrait or square
-                new_height = 1024
-                new_width = int(1024 * original_aspect_ratio)
-            
-            # Resize the image maintaining aspect ratio
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Center the resized image on the canvas
-            x_offset = (1024 - new_width) // 2
-            y_offset = (1024 - new_height) // 2
-            canvas.paste(img_resized, (x_offset, y_offset))
-            
+            # Load and prepare the image; the composite file is closed once it is resized
+            with Image.open(composite_image_path) as img:
+                # Convert to RGB if necessary
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                
+                # Resize to 1024x1024 (GPT Image 1 requirement) while maintaining aspect ratio
+                original_width, original_height = img.size
+                original_aspect_ratio = original_width / original_height
+                
+                print(f"   📐 Original composite: {original_width}x{original_height} (aspect ratio: {original_aspect_ratio:.2f})")
+                
+                # Create a 1024x1024 canvas and center the image maintaining aspect ratio
+                canvas = Image.new('RGB', (1024, 1024), 'white')
+                
+                # Calculate new dimensions to fit within 1024x1024 while maintaining aspect ratio
+                if original_aspect_ratio > 1:  # Landscape
+                    new_width = 1024
+                    new_height = int(1024 / original_aspect_ratio)
+                else:  # Portrait or square
+                    new_height = 1024
+                    new_width = int(1024 * original_aspect_ratio)
+                
+                # Resize the image maintaining aspect ratio
+                img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                
+                # Center the resized image on the canvas
+                x_offset = (1024 - new_width) // 2
+                y_offset = (1024 - new_height) // 2
+                canvas.paste(img_resized, (x_offset, y_offset))
+                
             print(f"   📐 Resized to: {new_width}x{new_height}, centered at ({x_offset}, {y_offset})")
             
             img = canvas
             
-            # Save as PNG for GPT Image 1
-            prepared_image_path = os.path.join(output_dir, "prepared_composite.png")
-            img.save(prepared_image_path, 'PNG')
+            # Save as JPEG for GPT Image 1 (accepted by gpt-image-1, typically a fraction of the PNG upload)
+            prepared_image_path = os.path.join(output_dir, "prepared_composite.jpg")
+            img.save(prepared_image_path, 'JPEG', quality=90, optimize=True, progressive=True)
             
             print(f"✅ Prepared image saved as: {prepared_image_path}")
             
             # Use GPT Image 1 (Image Edit API)
             print("🖼️ Calling GPT Image 1 (Image Edit API)...")
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
             with open(prepared_image_path, 'rb') as image_file:
                 files = {
-                    'image': image_file,
+                    'image': (os.path.basename(prepared_image_path), image_file, 'image/jpeg'),
                     'prompt': (None, prompt),
                     'n': (None, '1'),
                     'size': (None, '1024x1024'),
@@ -439,11 +935,11 @@ Rules:
                     'input_fidelity': (None, input_fidelity)
                 }
                 
-                response = requests.post(
-                    "https://api.openai.com/v1/images/edits",
-                    headers=headers,
+                response = self.http.post(
+                    self.image_edit_url,
+                    headers=self._auth_headers,
                     files=files,
-                    timeout=120
+                    timeout=(CONNECT_TIMEOUT, 120)
                 )
             
             if not response.ok:
@@ -451,55 +947,133 @@ Rules:
                 print(f"❌ GPT Image 1 Error: {response.status_code} - {error_details}")
                 raise Exception(f"GPT Image 1 API Error: {response.status_code} - {error_details}")
             
-            result = response.json()
+            result = json_utils.loads(response.content)
             print(f"✅ GPT Image 1 response received")
             print(f"🔍 Response keys: {list(result.keys())}")
             
-            # Save the generated image
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            final_image_path = os.path.join(output_dir, f"real_products_overlay_design_{timestamp}.png")
-            
-            # Extract image data from GPT Image 1 response
-            if 'data' in result and len(result['data']) > 0:
-                data_item = result['data'][0]
-                
-                # Check if we have URL or base64 data
-                if 'url' in data_item:
-                    print(f"✅ GPT Image 1 edit successful (URL)")
-                    # Download and save the image
-                    image_response = requests.get(data_item['url'])
-                    image_response.raise_for_status()
-                    
-                    with open(final_image_path, 'wb') as f:
-                        f.write(image_response.content)
-                elif 'b64_json' in data_item:
-                    print(f"✅ GPT Image 1 edit successful (base64)")
-                    # Convert base64 to file
-                    import base64
-                    image_data = base64.b64decode(data_item['b64_json'])
-                    
-                    with open(final_image_path, 'wb') as f:
-                        f.write(image_data)
-                else:
-                    raise Exception("No image data found in GPT Image 1 response")
-            else:
-                raise Exception("No data in GPT Image 1 response")
-            
-            print(f"✅ SerpAPI Google Shopping products design saved as: {final_image_path}")
-            return final_image_path
+            return self._save_image_edit_result(result, output_dir)
             
         except Exception as e:
             print(f"❌ Error in GPT Image 1 overlay: {e}")
             raise
     
+    def edit_with_product_images(self, base_image_path: str, products: List[Dict], output_dir: str) -> str:
+        """Use GPT Image 1 multi-image input: the room and each product image are sent as separate images"""
+        try:
+            # Room first (image 1), then products in the order they are listed in the prompt
+            edit_products = self._select_edit_products(products, MAX_EDIT_IMAGES - 1)
+            room_image = self._normalize_edit_input(base_image_path, output_dir)
+            prompt = create_real_products_pathway_prompt(edit_products)
+            print(f"🖼️ Calling GPT Image 1 with the room and {len(edit_products)} product images...")
+            
+            # ExitStack closes every image handle even if the request fails
+            with ExitStack() as stack:
+                images = [room_image] + [(product['image_path'], _detected_mime_type(product['image_path']))
+                                         for product in edit_products]
+                # Explicit filename per part, and the MIME type of the decoded image rather than the
+                # file extension (uploads are always named .png, downloads always .jpg)
+                # (left off when PIL cannot identify the file)
+                files = [
+                    ('image[]', (os.path.basename(path), stack.enter_context(open(path, 'rb'))) + ((mime_type,) if mime_type else ()))
+                    for path, mime_type in images
+                ]
+                files += [
+                    ('prompt', (None, prompt)),
+                    ('n', (None, '1')),
+                    ('size', (None, '1024x1024')),  # Same output size as the composite pathway
+                    ('model', (None, 'gpt-image-1')),
+                    ('input_fidelity', (None, "low" if self.fast_mode else "high"))
+                ]
+                
+                response = self.http.post(
+                    self.image_edit_url,
+                    headers=self._auth_headers,
+                    files=files,
+                    timeout=(CONNECT_TIMEOUT, 120)
+                )
+            
+            if not response.ok:
+                error_details = response.text
+                print(f"❌ GPT Image 1 Error: {response.status_code} - {error_details}")
+                raise Exception(f"GPT Image 1 API Error: {response.status_code} - {error_details}")
+            
+            print(f"✅ GPT Image 1 response received")
+            return self._save_image_edit_result(json_utils.loads(response.content), output_dir)
+            
+        except Exception as e:
+            print(f"❌ Error in GPT Image 1 multi-image edit: {e}")
+            raise
+    
+    def _normalize_edit_input(self, image_path: str, output_dir: str) -> Tuple[str, str]:
+        """Return (path, MIME type) of image_path if GPT Image 1 accepts it as is, else of a PNG re-encoded into output_dir"""
+        with Image.open(image_path) as img:
+            if img.format in EDIT_INPUT_FORMATS and img.mode in EDIT_INPUT_MODES:
+                return image_path, Image.MIME[img.format]
+            
+            print(f"🔄 Re-encoding {os.path.basename(image_path)} ({img.format}, {img.mode}) as PNG for GPT Image 1")
+            has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+            converted = img.convert('RGBA' if has_alpha else 'RGB')
+        
+        os.makedirs(output_dir, exist_ok=True)
+        normalized_path = os.path.join(output_dir, f"room_{os.path.splitext(os.path.basename(image_path))[0]}.png")
+        converted.save(normalized_path, 'PNG')
+        return normalized_path, 'image/png'
+    
+    def _select_edit_products(self, products: List[Dict], limit: int) -> List[Dict]:
+        """Pick up to limit products with images, one per product type first, then the remaining alternatives"""
+        with_images = [product for product in products if product.get('image_path')]
+        seen_types = set()
+        first_per_type, alternatives = [], []
+        for product in with_images:
+            product_type = product.get('product_type', 'unknown')
+            if product_type in seen_types:
+                alternatives.append(product)
+            else:
+                seen_types.add(product_type)
+                first_per_type.append(product)
+        return (first_per_type + alternatives)[:limit]
+    
+    def _save_image_edit_result(self, result: Dict[str, Any], output_dir: str) -> str:
+        """Save the image from a GPT Image 1 edit response and return its path"""
+        # Save the generated image
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        final_image_path = os.path.join(output_dir, f"real_products_overlay_design_{timestamp}.png")
+        
+        # Extract image data from GPT Image 1 response
+        if 'data' in result and len(result['data']) > 0:
+            data_item = result['data'][0]
+            
+            # Check if we have URL or base64 data
+            if 'url' in data_item:
+                print(f"✅ GPT Image 1 edit successful (URL)")
+                # Download and save the image
+                self.download_image(data_item['url'], final_image_path)
+            elif 'b64_json' in data_item:
+                print(f"✅ GPT Image 1 edit successful (base64)")
+                # Decode base64 to the file in chunks rather than building the whole image in memory;
+                # the chunk size is a multiple of 4, so every chunk decodes on its own
+                b64_data = data_item['b64_json']
+                with open(final_image_path, 'wb') as f:
+                    for start in range(0, len(b64_data), DOWNLOAD_CHUNK_SIZE):
+                        f.write(base64.b64decode(b64_data[start:start + DOWNLOAD_CHUNK_SIZE]))
+            else:
+                raise Exception("No image data found in GPT Image 1 response")
+        else:
+            raise Exception("No data in GPT Image 1 response")
+        
+        print(f"✅ SerpAPI Google Shopping products design saved as: {final_image_path}")
+        return final_image_path
+    
     def download_image(self, image_url: str, output_path: str) -> str:
         """Download image from URL and save to local path"""
         try:
-            response = requests.get(image_url, timeout=60)
-            response.raise_for_status()
-            
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            with self.http.get(image_url, timeout=(CONNECT_TIMEOUT, 60), stream=True) as response:
+                response.raise_for_status()
+                
+                # Copy the raw socket stream straight to disk, still undoing any gzip encoding
+                response.raw.decode_content = True
+                with open(output_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
             
             print(f"✅ Downloaded image to: {output_path}")
             return output_path
@@ -513,8 +1087,21 @@ Rules:
                                          custom_instructions: str = "",
                                          design_type: str = "interior redesign",
                                          serpapi_key: str = None,
-                                         fast_mode: bool = False) -> Dict[str, Any]:
-        """Complete real products pathway design generation: analyze + search + multi-image integration"""
+                                         fast_mode: bool = False,
+                                         analysis_results: Optional[Dict[str, Any]] = None,
+                                         on_products_ready: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+                                         multi_image: bool = True) -> Dict[str, Any]:
+        """Complete real products pathway design generation: analyze + search + multi-image integration
+        
+        Args:
+            multi_image: Send the room and product images to GPT Image 1 as separate inputs;
+                False builds the single composite layout image instead
+            analysis_results: Result of a previous analyze_image call for the same image;
+                when given, the GPT-4o Vision analysis step is skipped
+            on_products_ready: Called with products_info on a worker thread as soon as the
+                product search finishes, so it overlaps composite creation and GPT Image 1;
+                its return value is passed back as 'products_ready_result'
+        """
         
         # Initialize performance tracker
         tracker = create_tracker()
@@ -526,34 +1113,64 @@ Rules:
             session = SessionManager()
             print(f"📁 Session ID: {session.session_id}")
             
-            # Save analysis results to session
-            session.save_file('analysis', 'design_results.json', content=json.dumps({"status": "starting"}))
-            
             print(f"📁 Using organized session: {session.session_path}")
             
-            print("🔍 Step 1: Analyzing original image with GPT-4o Vision...")
+            # Standard mode searches up to 12 product types, fast mode the top 3
+            max_product_types = 3 if fast_mode else 12
             
-            # Step 1: Analyze the original image with performance tracking
-            analysis_results = None
-            with track_vision_analysis(tracker, {
-                "design_style": design_style,
-                "design_type": design_type,
-                "custom_instructions": custom_instructions
-            }):
-                analysis_results = self.analyze_image(
-                    image_path=image_path,
-                    design_style=design_style,
-                    custom_instructions=custom_instructions,
-                    design_type=design_type
-                )
+            analysis_stream = None
+            if analysis_results is not None:
+                print("🔍 Step 1: Using provided analysis results (skipping GPT-4o Vision call)")
+            else:
+                print("🔍 Step 1: Analyzing original image with GPT-4o Vision (streaming)...")
+                
+                # Step 1: Stream the analysis so product searches start while the remaining
+                # recommendations are still being generated. The palette and room analysis
+                # precede the recommendations in the response, so they are filled in by the
+                # time the first recommendation arrives
+                analysis_results = {}
+                vision_data = {
+                    "design_style": design_style,
+                    "design_type": design_type,
+                    "custom_instructions": custom_instructions
+                }
+                
+                def timed_analysis_stream():
+                    """Stream the analysis, recording "Vision Analysis" from the request to the end of the stream"""
+                    started = time.time()
+                    try:
+                        yield from self.analyze_image_stream(
+                            image_path=image_path,
+                            design_style=design_style,
+                            custom_instructions=custom_instructions,
+                            design_type=design_type,
+                            analysis_out=analysis_results
+                        )
+                    except Exception as e:
+                        tracker.record_step("Vision Analysis", started, success=False,
+                                            error_message=str(e), additional_data=vision_data)
+                        raise
+                    tracker.record_step("Vision Analysis", started, additional_data=vision_data)
+                
+                # The wait for the first recommendation is timed as its own step, since the
+                # rest of the stream is read while the product searches run
+                analysis_stream = timed_analysis_stream()
+                with tracker.track_step("Vision First Recommendation", vision_data):
+                    first_recommendation = next(analysis_stream, None)
+                
+                if first_recommendation is None or not analysis_results:
+                    # Either the stream is already over, or the fields before the recommendations
+                    # could not be parsed from it: search from the complete analysis instead
+                    if first_recommendation is not None:
+                        print("   ⚠️ Could not parse the streamed analysis prefix; waiting for the full analysis")
+                    for _ in analysis_stream:
+                        pass
+                    analysis_stream = None
             
             if not analysis_results:
                 tracker.end_pipeline(success=False, product_count=0)
                 return {"error": "Failed to analyze image"}
             
-            # Save analysis results to session
-            session.save_file('analysis', 'analysis_results.json', content=json.dumps(analysis_results, indent=2))
-            
             print("🛒 Step 2: Searching for real products using SerpAPI Google Shopping...")
             
             # Extract room analysis data for enhanced search
@@ -563,49 +1180,84 @@ Rules:
                 print(f"   🎨 Mood: {room_analysis.get('mood', 'Unknown mood')}")
                 print(f"   🏠 Style Details: {', '.join(room_analysis.get('styleDetails', []))}")
             
-            # Initialize SerpAPI shopping
-            serpapi_shopping = SerpAPIShopping(serpapi_key)
+            # SerpAPI client shared by every run on this pathway (keep-alive connections)
+            serpapi_shopping = self.get_serpapi_shopping(serpapi_key)
             
-            # Extract recommendations and color palette
-            recommendations = analysis_results.get('recommendations', [])
+            # Extract color palette
             color_palette = analysis_results.get('colorPalette', {}).get('primary', [])
             
-            # Apply fast mode optimizations
-            if fast_mode:
-                print("   ⚡ Fast mode enabled - using aggressive optimizations")
-                # Limit to top 3 product types in fast mode
-                if len(recommendations) > 3:
-                    recommendations = recommendations[:3]
-                    print(f"   ⚡ Fast mode: Limited to top 3 product types")
-            else:
-                # Standard mode: search for up to 12 product types
-                if len(recommendations) > 12:
-                    recommendations = recommendations[:12]
-                    print(f"   📦 Standard mode: Limited to top 12 product types")
-            
             # Step 3: Search for real products using SerpAPI Google Shopping (PARALLEL)
             print("🛒 Step 3: Searching for real products using SerpAPI Google Shopping (PARALLEL)...")
             
-            # Store session for parallel processing
-            self.session = session
-            
             # Calculate target products based on 70% of (product types × 3 alternatives)
             alternatives_per_type = 3
-            target_products = int(len(recommendations) * alternatives_per_type * 0.7)
-            early_exit_threshold = max(target_products, 3)  # Minimum of 3 products
             
-            print(f"   🎯 Target: {len(recommendations)} types × {alternatives_per_type} alternatives = {len(recommendations) * alternatives_per_type} max")
-            print(f"   ⚡ Early exit at 70%: {early_exit_threshold} products")
+            if analysis_stream is not None:
+                if fast_mode:
+                    print("   ⚡ Fast mode enabled - using aggressive optimizations")
+                print(f"   📦 Searching up to {max_product_types} product types as they are streamed")
+                analysis_complete = threading.Event()
+                analysis_succeeded = []
+                submitted_recommendations = []
+                
+                def streamed_recommendations():
+                    """Yield the first recommendations, then finish the stream before downloads may start"""
+                    try:
+                        for recommendation in islice(chain([first_recommendation], analysis_stream), max_product_types):
+                            submitted_recommendations.append(recommendation)
+                            yield recommendation
+                        # Read the rest so analysis_results is complete and a truncated or
+                        # invalid response raises before any product image is downloaded
+                        for _ in analysis_stream:
+                            pass
+                        analysis_succeeded.append(True)
+                    finally:
+                        analysis_complete.set()
+                
+                def analysis_ok() -> bool:
+                    analysis_complete.wait()
+                    return bool(analysis_succeeded)
+                
+                recommendations = streamed_recommendations()
+                download_gate = analysis_ok
+                # Worked out from the number of searches once the stream has been read
+                target_products = None
+                early_exit_threshold = None
+            else:
+                # Extract recommendations
+                recommendations = analysis_results.get('recommendations', [])
+                submitted_recommendations = recommendations
+                download_gate = None
+                
+                # Apply fast mode optimizations
+                if fast_mode:
+                    print("   ⚡ Fast mode enabled - using aggressive optimizations")
+                    # Limit to top 3 product types in fast mode
+                    if len(recommendations) > max_product_types:
+                        recommendations = recommendations[:max_product_types]
+                        print(f"   ⚡ Fast mode: Limited to top 3 product types")
+                else:
+                    # Standard mode: search for up to 12 product types
+                    if len(recommendations) > max_product_types:
+                        recommendations = recommendations[:max_product_types]
+                        print(f"   📦 Standard mode: Limited to top 12 product types")
+                
+                target_products = int(len(recommendations) * alternatives_per_type * 0.7)
+                early_exit_threshold = max(target_products, 3)  # Minimum of 3 products
+                
+                print(f"   🎯 Target: {len(recommendations)} types × {alternatives_per_type} alternatives = {len(recommendations) * alternatives_per_type} max")
+                print(f"   ⚡ Early exit at 70%: {early_exit_threshold} products")
             
             # Use parallel search with performance tracking
             real_products_with_images = []
-            with track_product_search(tracker, {
-                "recommendations_count": len(recommendations),
+            search_data = {
+                "recommendations_count": len(recommendations) if isinstance(recommendations, list) else None,
                 "design_style": design_style,
                 "fast_mode": fast_mode,
                 "target_products": target_products,
                 "early_exit_threshold": early_exit_threshold
-            }):
+            }
+            with track_product_search(tracker, search_data):
                 real_products_with_images = self.search_products_parallel(
                     serpapi_shopping=serpapi_shopping,
                     recommendations=recommendations,
@@ -613,8 +1265,16 @@ Rules:
                     color_palette=color_palette,
                     room_analysis=room_analysis,
                     early_exit_threshold=early_exit_threshold,
-                    fast_mode=fast_mode
+                    fast_mode=fast_mode,
+                    session=session,
+                    download_gate=download_gate
                 )
+                # Streamed recommendations are only counted once they have all been submitted
+                search_data["recommendations_count"] = len(submitted_recommendations)
+            
+            # Save analysis results to session (written before any exit, so a failed run keeps them too)
+            session.save_file('analysis', 'analysis_results.json',
+                              content=json_utils.dumps(analysis_results, indent=True))
             
             if not real_products_with_images:
                 tracker.end_pipeline(success=False, product_count=0)
@@ -622,54 +1282,77 @@ Rules:
             
             print(f"   🎉 Found {len(real_products_with_images)} products with images")
             
-            # Step 4: Create composite layout with base image and products
-            print("🎨 Step 4: Creating composite layout with base image and products...")
-            
             # Prepare products info for immediate return (before image generation)
-            products_info = []
-            for i, product in enumerate(real_products_with_images, 1):
-                product_info = {
-                    'name': product['name'],
-                    'price': product['price'],
-                    'retailer': product['retailer'],
-                    'url': product['url'],
-                    'rating': product.get('rating'),
-                    'reviews': product.get('reviews'),
-                    'image_path': product['image_path']
-                }
-                products_info.append(product_info)
-            
-            # Create composite layout with performance tracking
-            composite_path = None
-            with track_composite_creation(tracker, {
-                "product_count": len(real_products_with_images),
-                "fast_mode": fast_mode
-            }):
-                composite_path = self.create_composite_layout(image_path, real_products_with_images, session.get_path('composites'))
-            
-            # Step 5: Use GPT Image 1 to overlay products onto base image
-            print("🎨 Step 5: Using GPT Image 1 to overlay products onto base image...")
+            products_info = [
+                {key: product.get(key) for key in PRODUCT_INFO_KEYS}
+                for product in real_products_with_images
+            ]
+            
+            # Hand products to the caller (e.g. shopping list generation) while the
+            # composite and final image are still being produced
+            products_ready_future = None
+            if on_products_ready is not None:
+                products_ready_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="products-ready")
+                products_ready_future = products_ready_executor.submit(on_products_ready, products_info)
+                products_ready_executor.shutdown(wait=False)
             
             final_image_path = None
-            with track_image_generation(tracker, {
-                "fast_mode": fast_mode,
-                "product_count": len(real_products_with_images)
-            }):
-                final_image_path = self.overlay_products_with_gpt_image_1(composite_path, session.get_path('final_designs'))
+            if multi_image:
+                # Step 5: The room and products go to GPT Image 1 as separate images, so no composite is built
+                print("🎨 Step 5: Using GPT Image 1 to add the product images to the room...")
+                with track_image_generation(tracker, {
+                    "fast_mode": fast_mode,
+                    "product_count": len(real_products_with_images)
+                }):
+                    final_image_path = self.edit_with_product_images(image_path, real_products_with_images, session.get_path('final_designs'))
+            else:
+                # Step 4: Create composite layout with base image and products
+                print("🎨 Step 4: Creating composite layout with base image and products...")
+                composite_path = None
+                with track_composite_creation(tracker, {
+                    "product_count": len(real_products_with_images),
+                    "fast_mode": fast_mode
+                }):
+                    composite_path = self.create_composite_layout(image_path, real_products_with_images, session.get_path('composites'))
+                
+                # Step 5: Use GPT Image 1 to overlay products onto base image
+                print("🎨 Step 5: Using GPT Image 1 to overlay products onto base image...")
+                
+                with track_image_generation(tracker, {
+                    "fast_mode": fast_mode,
+                    "product_count": len(real_products_with_images)
+                }):
+                    final_image_path = self.overlay_products_with_gpt_image_1(composite_path, session.get_path('final_designs'))
+            
+            products_ready_result = None
+            if products_ready_future is not None:
+                try:
+                    products_ready_result = products_ready_future.result()
+                except Exception as e:
+                    print(f"⚠️ on_products_ready callback failed: {e}")
             
             # End performance tracking
             tracker.end_pipeline(success=True, product_count=len(real_products_with_images))
             
-            # Save performance report to session
-            report_path = tracker.save_performance_report()
-            session.save_file('debug', 'performance_report.json', source_path=report_path)
+            # Save performance report to session and create latest symlink on a worker
+            # thread while the summary is printed; joined before returning so the
+            # report path in the result exists
+            report_path = tracker.get_report_path()
+            
+            def finalize_session():
+                try:
+                    tracker.save_performance_report()
+                    session.save_file('debug', 'performance_report.json', source_path=report_path)
+                    session.create_latest_symlink()
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not save performance report: {e}")
+            
+            finalize_thread = threading.Thread(target=finalize_session, name="finalize-session")
+            finalize_thread.start()
             
             # Print performance summary
             tracker.print_summary()
             
-            # Create latest symlink for easy access
-            session.create_latest_symlink()
-            
             # Debug: Log the final product data structure
             print(f"🔍 Final products_info structure:")
             for i, product in enumerate(real_products_with_images):
@@ -678,6 +1361,8 @@ Rules:
                 print(f"      Image: {product.get('image_path', 'No image')}")
                 print(f"      Price: {product.get('price', 'No price')}")
             
+            finalize_thread.join()
+            
             return {
                 'success': True,
                 'session_id': session.session_id,
@@ -686,6 +1371,7 @@ Rules:
                 'final_design': final_image_path,
                 'products_info': products_info,
                 'products_used': len(real_products_with_images),
+                'products_ready_result': products_ready_result,
                 'design_style': design_style,
                 'analysis_results': analysis_results,
                 'performance_report': report_path,
@@ -700,15 +1386,46 @@ Rules:
             tracker.end_pipeline(success=False, product_count=0)
             return {"error": str(e)} 
 
-    def search_products_parallel(self, serpapi_shopping: SerpAPIShopping, recommendations: List[Dict], 
+    def search_products_parallel(self, serpapi_shopping: SerpAPIShopping, recommendations: Iterable[Dict], 
                                 design_style: str, color_palette: List[str], room_analysis: Dict,
-                                early_exit_threshold: int = 25, fast_mode: bool = False) -> List[Dict]:
+                                early_exit_threshold: Optional[int] = 25, fast_mode: bool = False,
+                                session=None, download_gate: Optional[Callable[[], bool]] = None) -> List[Dict]:
         """Search for products in parallel using ThreadPoolExecutor with optimized HTTP connections
         
         Args:
-            early_exit_threshold: Stop searching when we reach this many products (70% of target)
+            session: SessionManager that downloaded product images are saved into (passed
+                explicitly so concurrent pipelines on one pathway don't share state)
+            recommendations: List or generator of recommendations; each one is submitted as soon
+                as it is produced, so searching overlaps with whatever is generating them
+            early_exit_threshold: Stop searching when we reach this many products (70% of target);
+                None works it out from the number of recommendations once all are submitted
+            download_gate: Called before a search's images are downloaded; blocks until they
+                may start and returns False to skip them (e.g. the streamed analysis failed)
         """
         
+        def download_single_image(product_type: str, result: Dict) -> Optional[Dict]:
+            """Download one product image and register it with the session"""
+            try:
+                image_path = serpapi_shopping.download_product_image(result)
+                if not image_path:
+                    return None
+                # Shrink once here, before the session copy, so every later upload is small
+                image_path = _shrink_product_image(image_path, PRODUCT_IMAGE_MAX_SIDE)
+                # Save to session products directory
+                if session:
+                    product_filename = f"{product_type}_{os.path.basename(image_path)}"
+                    # Downloads are only ever replaced (never rewritten in place), so a hardlink is safe
+                    session_image_path = session.save_file('products', product_filename, source_path=image_path, link=True)
+                    result['image_path'] = session_image_path
+                else:
+                    result['image_path'] = image_path
+                result['product_type'] = product_type  # Add product type for context
+                print(f"   📸 Downloaded: {os.path.basename(image_path)}")
+                return result
+            except Exception as e:
+                print(f"   ⚠️ Failed to download image for {result.get('name', 'Unknown')}: {e}")
+                return None
+        
         def search_single_product(product: Dict) -> List[Dict]:
             """Search for a single product type with optimized HTTP session"""
             try:
@@ -725,26 +1442,21 @@ Rules:
                     sort_by="popularity"
                 )
                 
+                if search_results and download_gate is not None and not download_gate():
+                    return []
+                
                 if search_results and len(search_results) > 0:
-                    # Download product images in parallel for this product type
+                    # Hand the downloads to the shared image pool so this worker
+                    # only waits on them instead of fetching them one by one
+                    download_futures = [
+                        image_pool.submit(download_single_image, product['type'], result)
+                        for result in search_results[:3]  # Limit to top 3 per product type
+                    ]
                     products_with_images = []
-                    for result in search_results[:3]:  # Limit to top 3 per product type
-                        try:
-                            image_path = serpapi_shopping.download_product_image(result)
-                            if image_path:
-                                # Save to session products directory
-                                session = getattr(self, 'session', None)
-                                if session:
-                                    product_filename = f"{product['type']}_{os.path.basename(image_path)}"
-                                    session_image_path = session.save_file('products', product_filename, source_path=image_path)
-                                    result['image_path'] = session_image_path
-                                else:
-                                    result['image_path'] = image_path
-                                result['product_type'] = product['type']  # Add product type for context
-                                products_with_images.append(result)
-                                print(f"   📸 Downloaded: {os.path.basename(image_path)}")
-                        except Exception as e:
-                            print(f"   ⚠️ Failed to download image for {result.get('name', 'Unknown')}: {e}")
+                    for future in download_futures:
+                        result = future.result()
+                        if result:
+                            products_with_images.append(result)
                     
                     return products_with_images
                 else:
@@ -758,18 +1470,26 @@ Rules:
         print(f"🚀 Starting parallel product search with up to 8 workers...")
         
         # Use up to 8 workers for better performance
-        max_workers = min(len(recommendations), 8)
+        max_workers = min(len(recommendations), 8) if isinstance(recommendations, list) else 8
+        max_workers = max(max_workers, 1)
         print(f"   ⚡ Using {max_workers} parallel workers")
         
         real_products_with_images = []
         
-        # Execute searches in parallel with optimized connection pooling
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all search tasks
-            future_to_product = {
-                executor.submit(search_single_product, product): product 
-                for product in recommendations
-            }
+        # Execute searches in parallel with optimized connection pooling.
+        # SerpAPI searches are latency-bound while image downloads are
+        # bandwidth-bound, so downloads run on their own, wider pool.
+        with ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_WORKERS) as image_pool, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submit each search task as its recommendation arrives
+            future_to_product = {}
+            for product in recommendations:
+                future_to_product[executor.submit(search_single_product, product)] = product
+            
+            if early_exit_threshold is None:
+                early_exit_threshold = max(int(len(future_to_product) * 3 * 0.7), 3)
+                print(f"   🎯 Target: {len(future_to_product)} types × 3 alternatives = {len(future_to_product) * 3} max")
+                print(f"   ⚡ Early exit at 70%: {early_exit_threshold} products")
             
             # Collect results as they complete
             for future in as_completed(future_to_product):
@@ -783,6 +1503,8 @@ Rules:
                         # Early exit when we reach 70% threshold
                         if len(real_products_with_images) >= early_exit_threshold:
                             print(f"   ⚡ Early exit at 70% threshold: {len(real_products_with_images)}/{early_exit_threshold} products")
+                            # Drop searches that have not started yet instead of waiting for them
+                            executor.shutdown(wait=False, cancel_futures=True)
                             break
                     else:
                         print(f"   ⚠️ No products found for: {product['type']}")
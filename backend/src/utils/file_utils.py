@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+File Writing Helpers
+Atomic file writes and the small on-disk JSON cache used for designs, analyses and searches
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, suppress
+from typing import Any, IO, Iterator, Optional, Union
+
+from src.utils import json_utils
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'wb', **kwargs) -> Iterator[IO]:
+    """
+    Open a temp file next to path for writing; it replaces path once the block succeeds
+
+    Readers never see a partially written file, concurrent writers (per process and thread)
+    don't clobber each other's temp files, and an existing file (or any hardlink to it) is
+    replaced rather than rewritten in place. The temp file is removed if the block fails.
+
+    Args:
+        path (str): Final file path
+        mode (str): Write mode for open(), 'wb' or 'w'
+        **kwargs: Passed on to open() (e.g. buffering)
+    """
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+
+def atomic_write(path: str, data: Union[bytes, str]) -> None:
+    """Atomically write bytes or text to path (see atomic_open)"""
+    with atomic_open(path, 'wb' if isinstance(data, (bytes, bytearray, memoryview)) else 'w') as f:
+        f.write(data)
+
+
+class JsonFileCache:
+    """On-disk cache of JSON values, one file per key in a directory
+
+    Cache problems never fail the caller: an unreadable entry is a miss and a failed
+    write is only reported.
+    """
+
+    def __init__(self, directory: str, max_age: Optional[float] = None, label: str = "cache"):
+        """
+        Args:
+            directory (str): Where entries are stored; created on the first write
+            max_age (float): Ignore entries older than this many seconds; None keeps them forever
+            label (str): Name used in warnings, e.g. "analysis cache"
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.label = label
+
+    def path(self, key: str) -> str:
+        """File holding the entry for key (a hex digest or other filename-safe string)"""
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if missing, expired or unreadable"""
+        path = self.path(key)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, 'rb') as f:
+                return json_utils.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable {self.label} {path}: {e}")
+            return None
+
+    def save(self, key: str, value: Any) -> None:
+        """Atomically store value for key"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write(self.path(key), json_utils.dumps(value))
+        except Exception as e:
+            print(f"⚠️  Could not write {self.label}: {e}")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Helpers
+Uses orjson when it is installed and falls back to the standard json module
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize obj to UTF-8 encoded JSON bytes
+    
+    Args:
+        obj: Object to serialize; unsupported types (Path, datetime, ...) are converted with str()
+        indent (bool): Pretty-print with a 2-space indent
+    
+    Returns:
+        bytes: Encoded JSON document
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=str, option=option | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """Deserialize JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -6,9 +6,13 @@ Handles session-based directory creation and file organization
 
 import os
 import shutil
+import threading
+import uuid
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.file_utils import atomic_write
+
 
 class SessionManager:
     """Manages session-based file organization for AI image generation outputs"""
@@ -18,11 +22,12 @@ class SessionManager:
         Initialize session manager
         
         Args:
-            session_id (str): Custom session ID, defaults to timestamp
+            session_id (str): Custom session ID, defaults to a timestamp plus a random suffix
             base_dir (str): Base directory for all outputs
         """
         self.base_dir = Path(base_dir)
-        self.session_id = session_id or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        # Microseconds and a random suffix keep pipelines started in the same second apart
+        self.session_id = session_id or f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f')}_{uuid.uuid4().hex[:8]}"
         self.session_path = self.base_dir / "sessions" / self.session_id
         self.paths = self._create_session_paths()
         self._ensure_directories()
@@ -56,7 +61,7 @@ class SessionManager:
         """Get path for specific file type"""
         return self.paths.get(file_type, self.paths['debug'])
     
-    def save_file(self, file_type, filename, content=None, source_path=None):
+    def save_file(self, file_type, filename, content=None, source_path=None, link=False):
         """
         Save file to appropriate session directory
         
@@ -65,6 +70,8 @@ class SessionManager:
             filename (str): Name of file to save
             content (bytes/str): File content (if saving new file)
             source_path (str): Path to existing file to copy
+            link (bool): Hardlink source_path instead of copying it; only for sources that
+                are never rewritten in place, since the link shares their data
         
         Returns:
             str: Full path to saved file
@@ -73,14 +80,20 @@ class SessionManager:
         target_path = os.path.join(target_dir, filename)
         
         if source_path and os.path.exists(source_path):
-            # Copy existing file
+            if link:
+                # Hardlink (no data copied); fall back to a real copy across
+                # filesystems, on existing targets or without link support
+                try:
+                    os.link(source_path, target_path)
+                    print(f"📁 Linked {filename} to {file_type}/")
+                    return target_path
+                except OSError:
+                    pass
             shutil.copy2(source_path, target_path)
             print(f"📁 Copied {filename} to {file_type}/")
         elif content:
-            # Save new file
-            mode = 'wb' if isinstance(content, bytes) else 'w'
-            with open(target_path, mode) as f:
-                f.write(content)
+            # Written atomically, so readers and concurrent writers never see a partial file
+            atomic_write(target_path, content)
             print(f"💾 Saved {filename} to {file_type}/")
         else:
             raise ValueError("Either content or source_path must be provided")
@@ -140,26 +153,28 @@ class SessionManager:
         """Create symlink to latest session"""
         latest_path = Path(self.base_dir) / "sessions" / "latest"
         
-        # Remove existing symlink or file if it exists
-        if latest_path.exists():
+        # A real file or directory in the way is removed; an existing symlink is
+        # replaced atomically below, so concurrent sessions never race on it
+        if latest_path.exists() and not latest_path.is_symlink():
             try:
-                if latest_path.is_symlink():
-                    latest_path.unlink()
+                if latest_path.is_dir():
+                    shutil.rmtree(latest_path)
                 else:
-                    # If it's not a symlink, remove it safely
-                    if latest_path.is_dir():
-                        shutil.rmtree(latest_path)
-                    else:
-                        latest_path.unlink()
+                    latest_path.unlink()
             except Exception as e:
                 print(f"⚠️ Warning: Could not remove existing latest link: {e}")
         
-        # Create new symlink
+        # Create the new symlink under a unique name, then rename it over "latest".
+        # The target is relative to the link's own directory so it resolves from anywhere
+        temp_link = latest_path.with_name(f".latest.{os.getpid()}.{threading.get_ident()}")
         try:
-            latest_path.symlink_to(self.session_path, target_is_directory=True)
+            os.symlink(os.path.relpath(self.session_path, latest_path.parent), temp_link, target_is_directory=True)
+            os.replace(temp_link, latest_path)
             print(f"🔗 Created latest symlink: {latest_path} -> {self.session_path}")
         except Exception as e:
             print(f"⚠️ Warning: Could not create latest symlink: {e}")
+            if os.path.lexists(temp_link):
+                os.remove(temp_link)
             # Don't fail the entire process if symlink creation fails
 
 
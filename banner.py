@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Project Structure Banner
+Static overview text printed by main.py
+"""
+
+STRUCTURE_BANNER = """
+📁 NEW PROJECT STRUCTURE:
+   src/
+   ├── core/
+   │   ├── ai_image_generator.py (Main interface)
+   │   ├── real_products_pathway.py (Real product images)
+   │   └── prompts.py (All prompt templates)
+   ├── shopping/
+   │   ├── shopping_list_generator.py
+   │   ├── serpapi_shopping_integration.py
+   │   └── real_products_pathway_shopping_list.py
+   └── utils/
+       └── (utility functions)
+   tests/
+   ├── integration/test_real_products_analysis_only.py
+   └── test_image_generation_debug.py
+   examples/
+   ├── example_real_products.py
+   └── performance/test_performance_tracking.py
+   config/
+   ├── config_settings.py
+   └── config_template.py
+   shopping_lists/
+   └── (generated HTML files)
+
+🚀 AVAILABLE SCRIPTS:
+   • python tests/integration/test_real_products_analysis_only.py - Test analysis & shopping (no image)
+   • python tests/test_image_generation_debug.py - Debug image generation
+   • python examples/example_real_products.py - Real products pathway demo
+   • python examples/performance/test_performance_tracking.py - Performance tracking
+   • python src/shopping/serpapi_shopping_integration.py - SerpAPI integration
+
+🎯 ARCHITECTURE BENEFITS:
+   ✅ Real products pathway with SerpAPI integration
+   ✅ Centralized prompt management in prompts.py
+   ✅ Dedicated pathway class for real products
+   ✅ Easy to edit prompts without touching core logic
+   ✅ Maintainable and extensible codebase
+   ✅ Unified interface through main AIImageGenerator class
+
+🔧 PROMPT EDITING:
+   📝 Edit src/core/prompts.py to modify all AI prompts
+   📝 create_analysis_prompt() - For image analysis
+   📝 create_real_products_pathway_prompt() - For real products
+
+✅ Project focused on real products pathway!
+   Clean, focused architecture with SerpAPI integration"""
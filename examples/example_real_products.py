@@ -5,20 +5,39 @@ Example script showing Real Products Pathway - complete pipeline with image gene
 
 import sys
 import os
-import json
+import argparse
 from datetime import datetime
 
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.core.real_products_pathway import RealProductsPathway
 from config.config_settings import get_api_key, get_serpapi_key
 from src.utils.session_manager import SessionManager
+from src.utils import json_utils
+
+# Test image path (you can change this to your test image)
+DEFAULT_TEST_IMAGE = "/Users/sylviaschumacher/Desktop/Screenshot 2025-07-27 at 7.27.58 PM.png"
+
+# Design settings used for every image
+DESIGN_STYLE = "scandinavian"
+CUSTOM_INSTRUCTIONS = "Add clean lines, minimalist decor, and contemporary styling"
+DESIGN_TYPE = "interior redesign"
 
 
 def main():
     """Demonstrate Real Products Pathway - complete pipeline with image generation"""
     
+    parser = argparse.ArgumentParser(description="Real Products Pathway demo")
+    parser.add_argument("images", nargs="*",
+                        help="Images to process in this run (defaults to the built-in test image)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Run the image analysis through the OpenAI Batch API (50%% cost, may take up to 24h)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the image analysis and show recommendations as they arrive")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore the on-disk analysis cache and always call GPT-4o Vision")
+    args = parser.parse_args()
+    
     print("🎨 REAL PRODUCTS PATHWAY - COMPLETE PIPELINE")
     print("="*60)
     
@@ -36,22 +55,54 @@ def main():
     
     print("✅ API keys configured")
     
-    # Initialize SessionManager for organized output
-    session = SessionManager()
-    print(f"📁 Session ID: {session.session_id}")
+    # Imported only once the keys are known to be set; this pulls in PIL and openai
+    from src.core.real_products_pathway import RealProductsPathway, ANALYSIS_CACHE_DIR
     
     # Initialize the real products pathway
-    real_products_pathway = RealProductsPathway(openai_key)
+    real_products_pathway = RealProductsPathway(
+        openai_key, analysis_cache_dir=None if args.no_cache else ANALYSIS_CACHE_DIR)
+    
+    image_paths = args.images or [DEFAULT_TEST_IMAGE]
+    
+    # In batch mode every image is analyzed by a single Batch API job up front
+    batch_analyses = {}
+    if args.batch:
+        print(f"\n🔍 Analyzing {len(image_paths)} image(s) with GPT-4o Vision (Batch API)...")
+        try:
+            batch_id = real_products_pathway.submit_analysis_batch(
+                image_paths=image_paths,
+                design_style=DESIGN_STYLE,
+                custom_instructions=CUSTOM_INSTRUCTIONS,
+                design_type=DESIGN_TYPE
+            )
+            batch = real_products_pathway.wait_for_batch(batch_id)
+            batch_analyses = real_products_pathway.get_analysis_batch_results(batch, image_paths)
+        except Exception as e:
+            print(f"❌ Error during batch analysis: {str(e)}")
+            return
+    
+    # One pathway (and its pooled HTTP connections) is shared by every image
+    for test_image_path in image_paths:
+        run_pipeline(real_products_pathway, test_image_path, serpapi_key, args,
+                     batch_analysis=batch_analyses.get(test_image_path))
+
+
+def run_pipeline(real_products_pathway, test_image_path: str, serpapi_key: str, args, batch_analysis=None):
+    """Run the complete pipeline for one image"""
     
-    # Test image path (you can change this to your test image)
-    test_image_path = "/Users/sylviaschumacher/Desktop/Screenshot 2025-07-27 at 7.27.58 PM.png"
+    # Initialize SessionManager for organized output
+    session = SessionManager()
+    print(f"📁 Session ID: {session.session_id}")
     
-    if not os.path.exists(test_image_path):
+    # One stat() call both checks the image and gives its size
+    try:
+        image_stat = os.stat(test_image_path)
+    except FileNotFoundError:
         print(f"❌ Error: Test image '{test_image_path}' not found")
-        print("   Please update the test_image_path variable to point to your image")
+        print("   Pass image paths on the command line or update DEFAULT_TEST_IMAGE")
         return
     
-    print(f"✅ Test image found: {test_image_path}")
+    print(f"✅ Test image found: {test_image_path} ({image_stat.st_size / (1024 * 1024):.1f} MB)")
     
     try:
         print("\n🚀 Starting Real Products Pathway Pipeline...")
@@ -61,13 +112,27 @@ def main():
         print("   🎨 Step 4: Generate final image with real products")
         
         # Step 1: Analyze the image
-        print("\n🔍 STEP 1: Analyzing image with GPT-4o Vision...")
-        analysis_results = real_products_pathway.analyze_image(
-            image_path=test_image_path,
-            design_style="scandinavian",
-            custom_instructions="Add clean lines, minimalist decor, and contemporary styling",
-            design_type="interior redesign"
-        )
+        if args.batch:
+            print("\n🔍 STEP 1: Using GPT-4o Vision analysis from the Batch API...")
+            analysis_results = batch_analysis
+        elif args.stream:
+            print("\n🔍 STEP 1: Analyzing image with GPT-4o Vision (streaming)...")
+            analysis_results = {}
+            for i, rec in enumerate(real_products_pathway.analyze_image_stream(
+                    image_path=test_image_path,
+                    design_style=DESIGN_STYLE,
+                    custom_instructions=CUSTOM_INSTRUCTIONS,
+                    design_type=DESIGN_TYPE,
+                    analysis_out=analysis_results), 1):
+                print(f"   📥 Recommendation {i}: {rec.get('area', 'General')} - {rec.get('type', 'Unknown')}")
+        else:
+            print("\n🔍 STEP 1: Analyzing image with GPT-4o Vision...")
+            analysis_results = real_products_pathway.analyze_image(
+                image_path=test_image_path,
+                design_style=DESIGN_STYLE,
+                custom_instructions=CUSTOM_INSTRUCTIONS,
+                design_type=DESIGN_TYPE
+            )
         
         if not analysis_results:
             print("❌ Error: Image analysis failed")
@@ -96,12 +161,29 @@ def main():
         print("   🛒 Searching for real products using SerpAPI...")
         print("   🎨 Creating final image with GPT Image 1...")
         
+        # Step 3 only needs the product list, so the shopping list is built on a
+        # worker thread while the composite and final image are still generating
+        from src.shopping.real_products_pathway_shopping_list import create_serpapi_shopping_list
+        
+        def build_shopping_list(products_info):
+            # The shopping list reads product_url and permanent_image_path, not url and image_path
+            shopping_products = [
+                {**product, 'product_url': product.get('url'), 'permanent_image_path': product.get('image_path')}
+                for product in products_info
+            ]
+            products_file = session.save_file('analysis', 'shopping_list_products.json',
+                                              content=json_utils.dumps({'serpapiProductsComposition': {'products_info': shopping_products}}, indent=True))
+            return create_serpapi_shopping_list(products_file)
+        
+        # Reuse the Step 1 analysis instead of paying for a second Vision call
         final_results = real_products_pathway.generate_design_with_real_products(
             image_path=test_image_path,
-            design_style="scandinavian",
-            custom_instructions="Add clean lines, minimalist decor, and contemporary styling",
-            design_type="interior redesign",
-            serpapi_key=serpapi_key
+            design_style=DESIGN_STYLE,
+            custom_instructions=CUSTOM_INSTRUCTIONS,
+            design_type=DESIGN_TYPE,
+            serpapi_key=serpapi_key,
+            analysis_results=analysis_results,
+            on_products_ready=build_shopping_list
         )
         
         if not final_results:
@@ -142,13 +224,10 @@ def main():
         
         # Save results to session for shopping list generation
         results_file = session.save_file('analysis', 'example_real_products_results.json', 
-                                       content=json.dumps(final_results, indent=2))
+                                       content=json_utils.dumps(final_results, indent=True))
         
-        # Import and use the shopping list function
-        from src.shopping.real_products_pathway_shopping_list import create_serpapi_shopping_list
-        
-        # Generate the shopping list HTML
-        shopping_list_file = create_serpapi_shopping_list(results_file)
+        # Shopping list HTML was generated alongside the final image
+        shopping_list_file = final_results.get('products_ready_result')
         
         if shopping_list_file:
             # Save shopping list to session
@@ -181,5 +260,6 @@ def main():
         print(f"❌ Error during pipeline: {str(e)}")
 
 
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Clients
+Provides one pooled requests.Session for OpenAI API calls so TCP/TLS connections are reused
+"""
+
+import threading
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import Retry
+
+# Transient statuses worth retrying (rate limits and server-side errors)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# POSTs (chat completions, image edits) are billed once processed, so they are only
+# retried on statuses that mean the request was rejected before any work was done
+POST_RETRY_STATUS_CODES = (429, 503)
+
+# Seconds to wait for a TCP/TLS connection; used as the first half of (connect, read)
+# timeouts so an unreachable host fails fast while slow model responses still get their full read time
+CONNECT_TIMEOUT = 5
+
+_openai_session: Optional[requests.Session] = None
+_openai_session_lock = threading.Lock()
+
+
+class _OpenAIRetry(Retry):
+    """Retry that re-sends a POST only on POST_RETRY_STATUS_CODES; a 500/502/504 may
+    come back after an image edit was generated (and billed), so only GETs retry those"""
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == 'POST' and status_code not in POST_RETRY_STATUS_CODES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def build_retry(total: int = 5, status_forcelist: Tuple[int, ...] = RETRY_STATUS_CODES,
+                backoff_factor: float = 1.0, backoff_max: float = 60.0) -> Retry:
+    """Retry policy with jittered exponential backoff that honours Retry-After on 429/503
+    
+    Args:
+        total: Retries after the first attempt (the default 5 means 6 attempts in all)
+        status_forcelist: Statuses retried for GETs; POSTs only ever retry POST_RETRY_STATUS_CODES
+    """
+    options = dict(
+        total=total,
+        backoff_factor=backoff_factor,  # 1s, 2s, 4s, ... between attempts
+        status_forcelist=status_forcelist,
+        allowed_methods=None,  # OpenAI calls are POSTs, retried on 429/503 only (see _OpenAIRetry)
+        read=0,  # A read timeout may mean the request was already processed and billed
+        respect_retry_after_header=True,
+        raise_on_status=False  # Return the last response so callers report the API error
+    )
+    try:
+        # urllib3 2.x: cap the wait and add random jitter so parallel workers don't retry in lockstep
+        return _OpenAIRetry(backoff_max=backoff_max, backoff_jitter=backoff_factor, **options)
+    except TypeError:
+        # urllib3 1.26 has neither option (its backoff is capped at 120s)
+        return _OpenAIRetry(**options)
+
+
+def get_openai_session() -> requests.Session:
+    """Return the process-wide OpenAI session, creating it on first use"""
+    global _openai_session
+    if _openai_session is None:
+        with _openai_session_lock:
+            if _openai_session is None:
+                session = requests.Session()
+                # Enable connection pooling (keep-alive across pathway/generator instances)
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=10,
+                    pool_maxsize=20,
+                    max_retries=build_retry()
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _openai_session = session
+    return _openai_session
@@ -4,19 +4,18 @@ Prompt templates for AI Image Generator
 All prompts are centralized here for easy editing and maintenance
 """
 
-def create_analysis_prompt(design_style: str = "modern", 
-                          custom_instructions: str = "",
-                          design_type: str = "interior redesign",
-                          room_type: str = "") -> str:
-    """Create the AI prompt for image analysis"""
-    
-    room_context = f"Room Type: {room_type.replace('-', ' ').title()}\n" if room_type else ""
-    
-    prompt = f"""As a professional design expert, analyze the provided image and create a detailed design transformation plan. Here are the requirements:
+from functools import lru_cache
+
+
+# Used when the caller gives no custom instructions
+_DEFAULT_CUSTOM_INSTRUCTIONS = "Create a comprehensive design transformation with multiple product categories including plants, artwork, storage, lighting, textiles, books, and decorative accessories for styling shelves, tables, and consoles"
+
+# Static body of the analysis prompt; only the placeholders vary per call
+_ANALYSIS_PROMPT_TEMPLATE = """As a professional design expert, analyze the provided image and create a detailed design transformation plan. Here are the requirements:
 
 {room_context}Design Style: {design_style}
 Design Type: {design_type}
-Custom Instructions: {custom_instructions if custom_instructions else 'Create a comprehensive design transformation with multiple product categories including plants, artwork, storage, lighting, textiles, books, and decorative accessories for styling shelves, tables, and consoles'}
+Custom Instructions: {custom_instructions}
 
 IMPORTANT: I have uploaded an image of the current space/object. Please carefully analyze this image to understand:
 - Current layout, structure, and spatial arrangements
@@ -99,76 +98,99 @@ Examples of SPECIFIC recommendations:
 
 Only suggest furniture replacement as a last resort - instead focus on how to style, accessorize, or modify existing pieces with SPECIFIC PRODUCTS.
 
-Format the response as JSON with this exact structure:
-{{
-    "designConcept": {{
-        "style": "string",
-        "colorPalette": ["array", "of", "colors"],
-        "materials": ["array", "of", "materials"],
-        "overallAssessment": "detailed assessment of current state",
-        "transformationConcept": "comprehensive design transformation concept"
-    }},
-    "recommendations": [
-        {{
-            "area": "specific area (e.g., 'Seating Area', 'Lighting', 'Wall Decor')",
-            "type": "product type (e.g., 'throw pillows', 'floor lamp', 'wall art')",
-            "description": "detailed product description with exact specifications",
-            "priority": "High/Medium/Low",
-            "estimatedCost": "cost range",
-            "placement": "specific placement instructions"
-        }}
-    ],
-    "colorPalette": {{
-        "primary": ["main colors"],
-        "accent": ["accent colors"],
-        "neutral": ["neutral colors"]
-    }},
-    "materials": ["list", "of", "materials"],
-    "lighting": "lighting recommendations",
-    "styling": "styling and decor recommendations",
-    "roomAnalysis": {{
-        "roomType": "specific room type (e.g., 'living room', 'bedroom', 'dining room')",
-        "existingFurniture": ["list of existing furniture pieces"],
-        "existingWindowTreatments": ["list of existing curtains, blinds, or window coverings"],
-        "existingLighting": ["list of existing lighting fixtures"],
-        "existingDecor": ["list of existing decorative elements and accessories"],
-        "existingFloorCoverings": ["list of existing rugs, carpets, or floor treatments"],
-        "existingWallTreatments": ["list of existing wall art, paint, or wall treatments"],
-        "colorScheme": ["current color scheme"],
-        "mood": "overall mood or atmosphere (e.g., 'cozy', 'bright', 'minimalist', 'warm')",
-        "styleDetails": ["specific style elements like 'mid-century', 'industrial', 'coastal']",
-        "architecturalFeatures": ["list of architectural features"],
-        "lightingConditions": "current lighting situation"
-    }}
-}}"""
-    
-    return prompt
-
-
-
-
-
-def create_real_products_pathway_prompt(products: list) -> str:
-    """Create prompt for real products pathway (multi-image approach)"""
+Format the response as JSON following the DesignPlan response schema."""
+
+
+def _string_array(description: str = None) -> dict:
+    """JSON Schema for a list of strings"""
+    schema = {"type": "array", "items": {"type": "string"}}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def _string(description: str = None) -> dict:
+    """JSON Schema for a string"""
+    return {"type": "string", "description": description} if description else {"type": "string"}
+
+
+def _strict_object(properties: dict) -> dict:
+    """JSON Schema object in the form strict structured outputs require (all keys required, no extras)"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+# Response structure for the analysis prompt, sent as response_format instead of
+# being spelled out in the prompt text. Structured outputs follow this key order,
+# so recommendations come last: a streaming reader has the palette and room
+# analysis it needs for product search before the first recommendation arrives
+ANALYSIS_RESPONSE_SCHEMA = _strict_object({
+    "designConcept": _strict_object({
+        "style": _string(),
+        "colorPalette": _string_array(),
+        "materials": _string_array(),
+        "overallAssessment": _string("detailed assessment of current state"),
+        "transformationConcept": _string("comprehensive design transformation concept")
+    }),
+    "colorPalette": _strict_object({
+        "primary": _string_array("main colors"),
+        "accent": _string_array("accent colors"),
+        "neutral": _string_array("neutral colors")
+    }),
+    "materials": _string_array(),
+    "lighting": _string("lighting recommendations"),
+    "styling": _string("styling and decor recommendations"),
+    "roomAnalysis": _strict_object({
+        "roomType": _string("specific room type (e.g., 'living room', 'bedroom', 'dining room')"),
+        "existingFurniture": _string_array("existing furniture pieces"),
+        "existingWindowTreatments": _string_array("existing curtains, blinds, or window coverings"),
+        "existingLighting": _string_array("existing lighting fixtures"),
+        "existingDecor": _string_array("existing decorative elements and accessories"),
+        "existingFloorCoverings": _string_array("existing rugs, carpets, or floor treatments"),
+        "existingWallTreatments": _string_array("existing wall art, paint, or wall treatments"),
+        "colorScheme": _string_array("current color scheme"),
+        "mood": _string("overall mood or atmosphere (e.g., 'cozy', 'bright', 'minimalist', 'warm')"),
+        "styleDetails": _string_array("specific style elements like 'mid-century', 'industrial', 'coastal'"),
+        "architecturalFeatures": _string_array("architectural features"),
+        "lightingConditions": _string("current lighting situation")
+    }),
+    "recommendations": {
+        "type": "array",
+        "items": _strict_object({
+            "area": _string("specific area (e.g., 'Seating Area', 'Lighting', 'Wall Decor')"),
+            "type": _string("product type (e.g., 'throw pillows', 'floor lamp', 'wall art')"),
+            "description": _string("detailed product description with exact specifications"),
+            "priority": {"type": "string", "enum": ["High", "Medium", "Low"]},
+            "estimatedCost": _string("cost range"),
+            "placement": _string("specific placement instructions")
+        })
+    }
+})
+
+
+@lru_cache(maxsize=128)
+def create_analysis_prompt(design_style: str = "modern", 
+                          custom_instructions: str = "",
+                          design_type: str = "interior redesign",
+                          room_type: str = "") -> str:
+    """Create the AI prompt for image analysis"""
     
-    # Create product descriptions
-    product_descriptions = []
-    for i, product in enumerate(products, 1):
-        area = product.get('area', 'General')
-        name = product.get('name', 'Unknown Product')
-        price = product.get('price')
-        retailer = product.get('retailer', 'Online Store')
-        
-        price_info = f" (${price})" if price else ""
-        product_descriptions.append(f"{i}. {name} - {area} - {retailer}{price_info}")
+    room_context = f"Room Type: {room_type.replace('-', ' ').title()}\n" if room_type else ""
     
-    # Create comprehensive prompt
-    prompt = f"""Transform this interior design by adding these real products naturally into the room:
+    return _ANALYSIS_PROMPT_TEMPLATE.format(
+        room_context=room_context,
+        design_style=design_style,
+        design_type=design_type,
+        custom_instructions=custom_instructions or _DEFAULT_CUSTOM_INSTRUCTIONS
+    )
 
-REAL PRODUCTS TO ADD:
-{chr(10).join(product_descriptions)}
 
-CRITICAL INSTRUCTIONS:
+# Static instructions closing every real products prompt
+_REAL_PRODUCTS_PROMPT_INSTRUCTIONS = """CRITICAL INSTRUCTIONS:
 - The first image shows the room to transform
 - The additional images show the real products to integrate
 - Add each product naturally to the appropriate area of the room
@@ -179,5 +201,33 @@ CRITICAL INSTRUCTIONS:
 - Do not add any other items beyond the specified products
 - Work with existing elements - if the room already has suitable curtains, lighting, or furniture, integrate new products to complement rather than replace them
 - Focus on enhancing existing elements rather than replacing them"""
+
+
+def create_real_products_pathway_prompt(products: list) -> str:
+    """Create prompt for real products pathway (multi-image approach)"""
+    
+    # Freeze the fields used by the prompt so the result can be cached
+    frozen_products = tuple(
+        (product.get('area', 'General'),
+         product.get('name', 'Unknown Product'),
+         product.get('price'),
+         product.get('retailer', 'Online Store'))
+        for product in products
+    )
+    return _create_real_products_pathway_prompt(frozen_products)
+
+
+@lru_cache(maxsize=128)
+def _create_real_products_pathway_prompt(products: tuple) -> str:
+    """Build the real products prompt from (area, name, price, retailer) tuples"""
+    
+    # Label each product with its input image: image 1 is the room, products start at image 2
+    product_list = "\n".join([
+        f"Image {i}: {name} - {area} - {retailer}{f' (${price})' if price else ''}"
+        for i, (area, name, price, retailer) in enumerate(products, 2)
+    ])
     
-    return prompt 
\ No newline at end of file
+    # Only the product list varies; the instructions are a module constant
+    return ("Transform this interior design by adding these real products naturally into the room:\n\n"
+            f"Image 1: the room to transform\n\nREAL PRODUCTS TO ADD:\n{product_list}\n\n"
+            + _REAL_PRODUCTS_PROMPT_INSTRUCTIONS) 
\ No newline at end of file
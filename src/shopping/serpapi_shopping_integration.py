@@ -5,30 +5,50 @@ Searches for real products and downloads images for AI design composition
 """
 
 import os
+import hashlib
 import requests
-import time
 import random
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import re # Added for regex in product description parsing
 
+from src.core.clients import build_retry, CONNECT_TIMEOUT
+from src.utils import json_utils
+from src.utils.file_utils import JsonFileCache, atomic_open
+
+# On-disk cache for parsed search results (product catalogs change slowly); stored as
+# JSON, never pickle, so a writable cache directory cannot inject code
+CACHE_DIR = os.path.join(".cache", "serpapi")
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
 class SerpAPIShopping:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cache_dir: Optional[str] = CACHE_DIR):
         self.api_key = api_key or os.getenv('SERPAPI_KEY')
         if not self.api_key:
             raise ValueError("SERPAPI_KEY not found in environment variables")
         
+        # Pass cache_dir=None to disable the search result cache
+        self.cache_dir = cache_dir
+        self.cache = JsonFileCache(cache_dir, max_age=CACHE_TTL_SECONDS, label="search cache") if cache_dir else None
+        
         # Create a session for connection reuse
         self.session = requests.Session()
         # Configure session for better performance
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
-        # Enable connection pooling
+        # Enable connection pooling; searches and image downloads are GETs, retried on
+        # 429/5xx with jittered exponential backoff (3 attempts in all), waiting for
+        # Retry-After when SerpAPI sends one
+        retry = build_retry(total=2)
+        # pool_connections is how many hosts keep a warm pool: product images come
+        # from many CDN hosts, and with too few the serpapi.com pool gets evicted
         adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10,
+            pool_connections=32,
             pool_maxsize=20,
-            max_retries=3
+            max_retries=retry
         )
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
@@ -62,8 +82,14 @@ class SerpAPIShopping:
                 params['price_low'] = 300
                 params['price_high'] = 2000
         
+        cache_key = self._get_cache_key(params)
+        cached_results = self.cache.load(cache_key) if cache_key else None
+        if cached_results is not None:
+            print(f"   💾 Using cached results for: {query} ({len(cached_results)} products)")
+            return cached_results
+        
         try:
-            response = self.session.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=(CONNECT_TIMEOUT, 30))
             response.raise_for_status()
             data = response.json()
             
@@ -90,12 +116,21 @@ class SerpAPIShopping:
                     results.append(parsed)
             
             print(f"   ✅ Found {len(results)} products for: {query}")
+            if results and cache_key:
+                self.cache.save(cache_key, results)
             return results
             
         except Exception as e:
             print(f"   ❌ Error searching SerpAPI: {e}")
             return []
     
+    def _get_cache_key(self, params: Dict) -> Optional[str]:
+        """Get the cache key for a set of search parameters (API key excluded)"""
+        if not self.cache:
+            return None
+        key_source = repr(sorted((k, v) for k, v in params.items() if k != 'api_key'))
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+    
     def parse_serpapi_result(self, item: Dict, original_query: str) -> Optional[Dict]:
         """Parse SerpAPI shopping result"""
         try:
@@ -387,6 +422,20 @@ class SerpAPIShopping:
             colors=colors
         )
     
+    def search_products_bulk(self, queries: List[str], max_results: int = 5, max_workers: int = 8) -> Dict[str, List[Dict]]:
+        """Run several search_products queries in parallel and return {query: products}
+        
+        Duplicate queries are searched once and appear once in the result, in the order
+        they first occur. Rate limits are handled by the session's Retry policy (429s wait
+        for Retry-After), so no sleep between queries is needed
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_queries))) as executor:
+            results = executor.map(lambda query: self.search_products(query, max_results=max_results), unique_queries)
+            return dict(zip(unique_queries, results))
+    
     def download_product_image(self, result_or_url, product_name: str = None, output_dir: str = None) -> Optional[str]:
         """Download product image and save to local directory"""
         
@@ -410,8 +459,8 @@ class SerpAPIShopping:
             safe_name = "".join(c for c in product_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
             safe_name = safe_name.replace(' ', '_')[:50]  # Limit length
             
-            # Create filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Create filename with timestamp (microseconds, so same-name downloads don't collide)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             filename = f"serpapi_product_{safe_name}_{timestamp}.jpg"
             
             # Use provided output directory or default
@@ -421,13 +470,16 @@ class SerpAPIShopping:
             else:
                 filepath = filename
             
-            # Download image using session for connection reuse
-            response = self.session.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Save image
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            # Download image using session for connection reuse, streamed to disk
+            # so concurrent downloads don't each hold a whole image in memory
+            with self.session.get(image_url, timeout=(CONNECT_TIMEOUT, 10), stream=True) as response:
+                response.raise_for_status()
+                
+                # Save image, copying the raw stream (gzip decoded) in 64 KiB chunks; written
+                # atomically, so an existing file (and any hardlink to it) is never rewritten
+                response.raw.decode_content = True
+                with atomic_open(filepath) as f:
+                    shutil.copyfileobj(response.raw, f, 64 * 1024)
             
             print(f"   📸 Downloaded: {os.path.basename(filepath)}")
             return filepath
@@ -435,6 +487,16 @@ class SerpAPIShopping:
         except Exception as e:
             print(f"   ❌ Error downloading image for {product_name}: {e}")
             return None
+    
+    def download_product_images(self, items: List[Tuple[str, str]], output_dir: str = None,
+                                max_workers: int = 16) -> List[Optional[str]]:
+        """Download several (image_url, product_name) pairs in parallel; paths come back in item order"""
+        if not items:
+            return []
+        # max_workers stays within the session's pool_maxsize so connections are reused, not discarded
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(
+                lambda item: self.download_product_image(item[0], item[1], output_dir=output_dir), items))
 
 def test_serpapi_shopping():
     """Test SerpAPI Google Shopping integration"""
@@ -455,11 +517,19 @@ def test_serpapi_shopping():
     print("   🛒 Getting real product URLs and prices")
     print()
     
-    for product_query in test_products:
+    # All searches run at once; results are printed in query order
+    results_by_query = api.search_products_bulk(test_products, max_results=2)
+    
+    # Then every product image is downloaded at once
+    with_images = [product for products in results_by_query.values() for product in products if product['image_url']]
+    local_paths = dict(zip(
+        (product['image_url'] for product in with_images),
+        api.download_product_images([(product['image_url'], product['name']) for product in with_images])
+    ))
+    
+    for product_query, products in results_by_query.items():
         print(f"🔍 Testing: {product_query}")
         
-        products = api.search_products(product_query, max_results=2)
-        
         for i, product in enumerate(products, 1):
             print(f"   {i}. {product['name'][:50]}...")
             print(f"      💰 Price: ${product['price']}" if product['price'] else "      💰 Price: Not available")
@@ -467,14 +537,11 @@ def test_serpapi_shopping():
             print(f"      ⭐ Rating: {product.get('rating', 'N/A')} ({product.get('reviews', 'N/A')} reviews)")
             print(f"      🔗 URL: {product['url'][:60]}...")
             
-            if product['image_url']:
-                local_path = api.download_product_image(product['image_url'], product['name'])
-                if local_path:
-                    print(f"      📸 Image: {local_path}")
+            local_path = local_paths.get(product['image_url'])
+            if local_path:
+                print(f"      📸 Image: {local_path}")
             
             print()
-        
-        time.sleep(1)  # Be respectful to API limits
 
 if __name__ == "__main__":
     test_serpapi_shopping() 
\ No newline at end of file
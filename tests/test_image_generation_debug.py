@@ -7,7 +7,6 @@ Uses the standard mode composite image to test GPT Image 1 generation
 import os
 import sys
 import openai
-import requests
 from datetime import datetime
 from PIL import Image
 
@@ -123,8 +122,9 @@ DESIGN PRINCIPLES:
                 'input_fidelity': (None, 'high')
             }
             
-            response = requests.post(
-                "https://api.openai.com/v1/images/edits",
+            # Same pooled session the pathway uses, so the download below reuses the connection pool
+            response = pathway.http.post(
+                pathway.image_edit_url,
                 headers=headers,
                 files=files,
                 timeout=120
@@ -151,7 +151,7 @@ DESIGN PRINCIPLES:
             if 'url' in data_item:
                 print(f"✅ GPT Image 1 edit successful (URL)")
                 # Download and save the image
-                image_response = requests.get(data_item['url'])
+                image_response = pathway.http.get(data_item['url'], timeout=60)
                 image_response.raise_for_status()
                 
                 with open(final_image_path, 'wb') as f:
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streamed analysis JSON helpers
+Covers _StreamingArrayScanner and _extract_json_object without any API calls
+"""
+
+import sys
+import os
+import json
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.real_products_pathway import _StreamingArrayScanner, _extract_json_object
+
+
+ANALYSIS = {
+    "designConcept": {"style": "modern {bold}", "colorPalette": ["sage", "cream"]},
+    "roomAnalysis": {"roomType": "living room", "mood": "cozy"},
+    "recommendations": [
+        {"type": "floor lamp", "description": "Brass lamp with a \"globe\" shade {60in}"},
+        {"type": "throw pillows", "description": "Set of 2, 18x18 [linen] }{"},
+        {"type": "wall art", "description": "Escaped backslash \\ and quote \\\" inside"}
+    ]
+}
+
+
+def feed_in_chunks(text, size):
+    """Feed text to a fresh scanner in fixed-size chunks, returning it and every item it produced"""
+    scanner = _StreamingArrayScanner('recommendations')
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(scanner.feed(text[start:start + size]))
+    return scanner, items
+
+
+def test_scanner_yields_every_item_for_any_chunk_size():
+    """Items come out complete and in order however the text is split"""
+    text = json.dumps(ANALYSIS)
+    for size in (1, 2, 3, 7, 64, len(text)):
+        scanner, items = feed_in_chunks(text, size)
+        assert items == ANALYSIS["recommendations"], f"chunk size {size}"
+        assert scanner.done
+
+
+def test_scanner_ignores_braces_and_brackets_inside_strings():
+    """Braces, brackets and escaped quotes in string values do not split items"""
+    _, items = feed_in_chunks(json.dumps(ANALYSIS), 5)
+    assert [item["description"] for item in items] == [rec["description"] for rec in ANALYSIS["recommendations"]]
+
+
+def test_scanner_parses_prefix_before_first_item():
+    """Fields before the array are available once the array starts, before any item is complete"""
+    text = json.dumps(ANALYSIS)
+    array_start = text.index('[', text.index('"recommendations"')) + 1
+    scanner = _StreamingArrayScanner('recommendations')
+    assert scanner.feed(text[:array_start]) == []
+    assert scanner.prefix == {
+        "designConcept": ANALYSIS["designConcept"],
+        "roomAnalysis": ANALYSIS["roomAnalysis"]
+    }
+
+
+def test_scanner_waits_for_array_key():
+    """Nothing is produced and no prefix is set until the array key and its [ have arrived"""
+    scanner = _StreamingArrayScanner('recommendations')
+    assert scanner.feed('{"roomAnalysis": {"roomType": "den"}, "recommen') == []
+    assert scanner.prefix is None
+    assert scanner.feed('dations": ') == []
+    assert scanner.prefix is None
+
+
+def test_scanner_stops_after_array_closes():
+    """Objects after the array are not reported as items"""
+    text = '{"recommendations": [{"type": "rug"}], "extra": {"type": "not an item"}}'
+    scanner, items = feed_in_chunks(text, 4)
+    assert items == [{"type": "rug"}]
+    assert scanner.done
+
+
+def test_extract_json_object_skips_surrounding_prose():
+    """The first complete object is returned, not everything up to the last }"""
+    content = 'Here is the plan: {"a": {"b": "}\\"{"}} and {"z": 1} afterwards'
+    assert json.loads(_extract_json_object(content)) == {"a": {"b": '}"{'}}
+
+
+def test_extract_json_object_ignores_braces_in_strings():
+    """Braces inside JSON string values do not end the object early"""
+    content = 'Result: {"description": "a {curly} value", "n": 2}. Use {braces} wisely'
+    assert json.loads(_extract_json_object(content)) == {"description": "a {curly} value", "n": 2}
+
+
+def test_extract_json_object_without_complete_object():
+    """No object, or one that never closes, gives None"""
+    assert _extract_json_object("no json here") is None
+    assert _extract_json_object('{"truncated": "at max_tokens') is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")